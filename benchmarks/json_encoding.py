@@ -0,0 +1,115 @@
+"""
+Compare response encoding paths for the large list endpoints.
+
+Run from the repository root:
+
+    python benchmarks/json_encoding.py [rows]
+
+For /exercises, /workout_logs and /progress it times, per request:
+  - stdlib:   validate + dump_python(mode='json') + JSONResponse.render (json.dumps)
+  - orjson:   the same, rendered by ORJSONResponse (the app default)
+  - dump_json: validate + pydantic's own encoder, what the cache stores on a miss
+  - old hit:  json.loads of the cached string, re-validated and re-encoded
+  - raw hit:  the cached bytes wrapped in a Response, what a hit costs now
+"""
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+import schemas
+
+
+def exercises(n):
+    now = datetime.now()
+    return [
+        {
+            "exercise_id": i,
+            "name": f"Exercise {i}",
+            "description": "Stand with feet shoulder-width apart and lower under control. " * 2,
+            "muscle_group": "legs",
+            "category": "strength",
+            "difficulty_level": "intermediate",
+            "equipment_needed": True,
+            "equipment_details": "barbell",
+            "calories_burnt_per_minute": 7.5,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def workout_logs(n):
+    user_id = uuid.uuid4()
+    start = datetime.now()
+    return [
+        {
+            "id": i,
+            "user_id": user_id,
+            "workout_plan_id": 1,
+            "date": start - timedelta(days=i),
+            "duration": 45,
+            "notes": "Felt strong today",
+        }
+        for i in range(n)
+    ]
+
+
+def progress(n):
+    user_id = uuid.uuid4()
+    start = datetime.now()
+    return [
+        {
+            "id": i,
+            "user_id": user_id,
+            "date": start - timedelta(days=i),
+            "weight": 80.5,
+            "bmi": 24.1,
+            "body_fat_percentage": 18.2,
+            "muscle_mass": 35.0,
+            "notes": None,
+        }
+        for i in range(n)
+    ]
+
+
+ENDPOINTS = {
+    "/exercises": (List[schemas.DisplayExercise], exercises),
+    "/workout_logs": (List[schemas.DisplayWorkoutLog], workout_logs),
+    "/progress": (List[schemas.DisplayProgress], progress),
+}
+
+
+def run(rows: int, number: int):
+    print(f"{rows} rows per response, best of 5 x {number} runs, microseconds per response\n")
+    print(f"{'endpoint':<15}" + "".join(f"{name:>11}" for name in ("stdlib", "orjson", "dump_json", "old hit", "raw hit")))
+    for endpoint, (model, make_rows) in ENDPOINTS.items():
+        adapter = TypeAdapter(model)
+        data = make_rows(rows)
+        cached_str = adapter.dump_json(adapter.validate_python(data)).decode()
+        cached_bytes = cached_str.encode()
+
+        cases = {
+            "stdlib": lambda: JSONResponse(adapter.dump_python(adapter.validate_python(data), mode="json")),
+            "orjson": lambda: ORJSONResponse(adapter.dump_python(adapter.validate_python(data), mode="json")),
+            "dump_json": lambda: Response(adapter.dump_json(adapter.validate_python(data)), media_type="application/json"),
+            "old hit": lambda: JSONResponse(adapter.dump_python(adapter.validate_python(json.loads(cached_str)), mode="json")),
+            "raw hit": lambda: Response(cached_bytes, media_type="application/json"),
+        }
+        timings = [min(timeit.repeat(case, number=number, repeat=5)) / number * 1e6 for case in cases.values()]
+        print(f"{endpoint:<15}" + "".join(f"{t:>11.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    run(rows, number=max(1, 20000 // rows))
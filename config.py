@@ -55,6 +55,12 @@ class Config:
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8080))
     PROJECT_ID = os.getenv("PROJECT_ID")
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 50))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 200))  # largest `limit` list endpoints accept
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))  # rows validated and copied per transaction
+    IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", 100))
+    PROGRESS_MOVING_AVERAGE_BUCKETS = int(os.getenv("PROGRESS_MOVING_AVERAGE_BUCKETS", 4))  # buckets per moving average
+    PROGRESS_ANALYTICS_TTL = int(os.getenv("PROGRESS_ANALYTICS_TTL", 24 * 3600))
 
     # --- Database Config ---
     DB_NAME = os.getenv("DB_NAME")
@@ -63,11 +69,49 @@ class Config:
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = int(os.getenv("DB_PORT", 5432))
     DB_CONNECTION_STRING = os.getenv("DATABASE_URL")
+    DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds before a connection is replaced
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))  # asyncpg and SQLAlchemy prepared statement caches; 0 disables both, required behind pgbouncer in transaction mode
 
     # --- Auth & API Keys ---
     SECRET_KEY = os.getenv("SECRET_KEY")
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # legacy HS256 signing secret
+    SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None)
+    SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", 600))
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 4096))
+    # Ask Supabase (`auth.get_user`) only when a token can't be checked locally
+    AUTH_REMOTE_FALLBACK = os.getenv("AUTH_REMOTE_FALLBACK", "true").lower() == "true"
     
+    # --- GenAI ---
+    GENAI_MAX_CONCURRENCY = int(os.getenv("GENAI_MAX_CONCURRENCY", 4))  # outstanding model calls per worker
+    GENAI_QUEUE_TIMEOUT = float(os.getenv("GENAI_QUEUE_TIMEOUT", 30))  # seconds to wait for a free slot
+    GENAI_INTENT_TIMEOUT = float(os.getenv("GENAI_INTENT_TIMEOUT", 10))
+    GENAI_PLAN_TIMEOUT = float(os.getenv("GENAI_PLAN_TIMEOUT", 90))
+    # Generate a plan outline first, then every week concurrently
+    GENAI_PLAN_PARALLEL = os.getenv("GENAI_PLAN_PARALLEL", "true").lower() == "true"
+    GENAI_WEEK_TIMEOUT = float(os.getenv("GENAI_WEEK_TIMEOUT", 45))
+    EXERCISE_CATALOG_TTL = int(os.getenv("EXERCISE_CATALOG_TTL", 900))  # reload even without an invalidation
+    INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", 7 * 24 * 3600))
+    PLAN_TEMPLATE_CACHE_TTL = int(os.getenv("PLAN_TEMPLATE_CACHE_TTL", 7 * 24 * 3600))
+    GENAI_JOB_WORKERS = int(os.getenv("GENAI_JOB_WORKERS", 2))  # background plan generations per worker process
+    GENAI_JOB_QUEUE_SIZE = int(os.getenv("GENAI_JOB_QUEUE_SIZE", 100))
+    GENAI_JOB_MAX_ATTEMPTS = int(os.getenv("GENAI_JOB_MAX_ATTEMPTS", 3))
+    GENAI_JOB_TTL = int(os.getenv("GENAI_JOB_TTL", 24 * 3600))  # how long job status stays queryable
+
     # --- Redis ---
-    REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
\ No newline at end of file
+    REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+    REDIS_HOST = os.getenv("REDIS_HOST", "organic-guppy-35039.upstash.io")
+    REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2))  # seconds to wait for a free connection
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1))  # per-command timeout in seconds
+    CACHE_L1_MAX_ITEMS = int(os.getenv("CACHE_L1_MAX_ITEMS", 1024))
+    CACHE_L1_TTL = int(os.getenv("CACHE_L1_TTL", 60))  # upper bound on staleness if an invalidation is missed
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
\ No newline at end of file
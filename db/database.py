@@ -1,25 +1,93 @@
 import contextlib
+import time
 from typing import Any, AsyncIterator
 from fastapi import Depends, HTTPException
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import (AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import Config
 
 # SQLALCHEMY_DATABASE_URL = f"postgresql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:{Config.DB_PORT}/{Config.DB_NAME}"
-SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:5432/{Config.DB_NAME}"
-print(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:{Config.DB_PORT}/{Config.DB_NAME}"
 
 
 
 Base = declarative_base()
 
 
+class PoolStats:
+    """Checkout wait times for the process-wide connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+
 class DatabaseSessionManager:
     def __init__(self,host:str,engine_kwargs: dict[str,Any]={}):
+        engine_kwargs = {
+            "echo": Config.DB_ECHO,
+            "poolclass": InstrumentedPool,
+            "pool_size": Config.DB_POOL_SIZE,
+            "max_overflow": Config.DB_MAX_OVERFLOW,
+            "pool_timeout": Config.DB_POOL_TIMEOUT,
+            "pool_pre_ping": Config.DB_POOL_PRE_PING,
+            "pool_recycle": Config.DB_POOL_RECYCLE,
+            # asyncpg's own cache and the dialect's prepared statement cache
+            # both keep named statements on the server connection
+            "connect_args": {
+                "statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+            },
+            **engine_kwargs,
+        }
         self._engine = create_async_engine(host, **engine_kwargs)
         self._session_factory = async_sessionmaker(expire_on_commit=False,bind=self._engine)
 
+    def pool_status(self) -> dict[str, Any]:
+        """Current pool occupancy and checkout wait statistics, for sizing instances."""
+        if self._engine is None:
+            raise HTTPException(status_code=500, detail="Engine is not initialized")
+        pool = self._engine.pool
+        capacity = pool.size() + max(Config.DB_MAX_OVERFLOW, 0)
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+            "checkouts": pool_stats.checkouts,
+            "checkout_timeouts": pool_stats.timeouts,
+            "avg_checkout_wait_ms": round(pool_stats.total_wait / pool_stats.checkouts * 1000, 3) if pool_stats.checkouts else 0.0,
+            "max_checkout_wait_ms": round(pool_stats.max_wait * 1000, 3),
+        }
+
     async def close(self):
         if self._engine is None:
             raise HTTPException(status_code=500, detail="Engine is not initialized")
@@ -52,7 +120,7 @@ class DatabaseSessionManager:
             finally:
                 await session.close()
 
-sessionmanger = DatabaseSessionManager(SQLALCHEMY_DATABASE_URL,engine_kwargs={"echo": True})
+sessionmanger = DatabaseSessionManager(SQLALCHEMY_DATABASE_URL)
 
 async def get_db():
     async with sessionmanger.session() as session:
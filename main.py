@@ -2,11 +2,14 @@ from alembic import command
 from fastapi import Depends, FastAPI, Response, HTTPException, status
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 import models
-from routes import users,exercise,auth,workout,workout_logs,progress,genai
+from routes import users,exercise,auth,workout,workout_logs,progress,genai,metrics,history
 from utils.logger import setup_logger
 from db.database import sessionmanger
+from utils.cache import cache
+from utils.jobs import job_queue
 from config import Config 
 
 import uvicorn
@@ -21,7 +24,18 @@ import uvicorn
 
 #     yield  # Continue running FastAPI after migrations
 
-app =FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared connections on startup and release them on shutdown."""
+    await cache.ping()
+    cache.start_invalidation_listener()
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await cache.close()
+    await sessionmanger.close()
+
+app =FastAPI(lifespan=lifespan,default_response_class=ORJSONResponse)
 
 logger = setup_logger(__name__)
 
@@ -32,6 +46,8 @@ app.include_router(workout.workout_route,prefix='/api')
 app.include_router(workout_logs.workout_log_route,prefix='/api')
 app.include_router(genai.genai_route,prefix='/api')
 app.include_router(progress.progress_route,prefix='/api')
+app.include_router(history.history_route,prefix='/api')
+app.include_router(metrics.metrics_route,prefix='/api')
 
 
 # Add CORS middleware
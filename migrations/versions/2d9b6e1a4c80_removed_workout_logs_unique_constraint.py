@@ -0,0 +1,29 @@
+"""removed workout logs unique constraint
+
+Revision ID: 2d9b6e1a4c80
+Revises: 9fea74d0fae5
+Create Date: 2026-10-18 20:02:17.381904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d9b6e1a4c80'
+down_revision: Union[str, None] = '9fea74d0fae5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A user logs many workouts; the unique index allowed only one
+    op.drop_index('ix_workout_logs_user_id', table_name='workout_logs')
+    op.create_index(op.f('ix_workout_logs_user_id'), 'workout_logs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_workout_logs_user_id'), table_name='workout_logs')
+    op.create_index('ix_workout_logs_user_id', 'workout_logs', ['user_id'], unique=True)
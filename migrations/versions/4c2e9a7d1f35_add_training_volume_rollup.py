@@ -0,0 +1,49 @@
+"""add training volume rollup
+
+Revision ID: 4c2e9a7d1f35
+Revises: 2d9b6e1a4c80
+Create Date: 2026-10-18 17:30:12.504113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2e9a7d1f35'
+down_revision: Union[str, None] = '2d9b6e1a4c80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('training_volume',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('muscle_group', sa.String(), nullable=False),
+    sa.Column('sets', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('tonnage', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'week_start', 'muscle_group')
+    )
+    # Backfill from the existing history; afterwards the app keeps it current
+    op.execute("""
+        INSERT INTO training_volume (user_id, week_start, muscle_group, sets, reps, tonnage)
+        SELECT workout_logs.user_id,
+               date_trunc('week', workout_logs.date)::date,
+               coalesce(exercise.muscle_group, 'unspecified'),
+               sum(coalesce(workout_log_exercises.sets_completed, 0)),
+               sum(coalesce(workout_log_exercises.sets_completed, 0) * coalesce(workout_log_exercises.reps_completed, 0)),
+               sum(coalesce(workout_log_exercises.sets_completed, 0) * coalesce(workout_log_exercises.reps_completed, 0) * coalesce(workout_log_exercises.weight_used, 0))
+        FROM workout_log_exercises
+        JOIN workout_logs ON workout_logs.id = workout_log_exercises.workout_log_id
+        JOIN exercise ON exercise.exercise_id = workout_log_exercises.exercise_id
+        WHERE workout_logs.date IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('training_volume')
@@ -0,0 +1,51 @@
+"""add personal records
+
+Revision ID: b81f4d3c6e92
+Revises: 4c2e9a7d1f35
+Create Date: 2026-10-18 18:05:41.218730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f4d3c6e92'
+down_revision: Union[str, None] = '4c2e9a7d1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('personal_records',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=True),
+    sa.Column('max_weight_reps', sa.Integer(), nullable=True),
+    sa.Column('max_reps', sa.Integer(), nullable=True),
+    sa.Column('estimated_one_rep_max', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercise.exercise_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id')
+    )
+    # Backfill from the existing history; afterwards the app keeps it current
+    op.execute("""
+        INSERT INTO personal_records (user_id, exercise_id, max_weight, max_weight_reps, max_reps, estimated_one_rep_max)
+        SELECT workout_logs.user_id,
+               workout_log_exercises.exercise_id,
+               max(weight_used) FILTER (WHERE weight_used > 0),
+               (array_agg(CASE WHEN weight_used > 0 THEN reps_completed END
+                          ORDER BY weight_used DESC NULLS LAST, reps_completed DESC NULLS LAST))[1],
+               max(reps_completed) FILTER (WHERE reps_completed > 0),
+               max(CASE WHEN reps_completed = 1 THEN weight_used ELSE weight_used * (1 + reps_completed / 30.0) END)
+                   FILTER (WHERE weight_used > 0 AND reps_completed > 0)
+        FROM workout_log_exercises
+        JOIN workout_logs ON workout_logs.id = workout_log_exercises.workout_log_id
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('personal_records')
@@ -0,0 +1,40 @@
+"""add workout log totals
+
+Revision ID: e5a90c27d4b1
+Revises: b81f4d3c6e92
+Create Date: 2026-10-18 18:42:09.663215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a90c27d4b1'
+down_revision: Union[str, None] = 'b81f4d3c6e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('workout_logs', sa.Column('estimated_calories', sa.Float(), server_default='0', nullable=False))
+    # Backfill from the existing history; afterwards the app computes it on write
+    op.execute("""
+        UPDATE workout_logs
+        SET estimated_calories = coalesce(workout_logs.duration, 0) * coalesce(totals.calories_per_minute, 0)
+        FROM (
+            SELECT workout_log_exercises.workout_log_id,
+                   sum(coalesce(workout_log_exercises.sets_completed, 0) * coalesce(exercise.calories_burnt_per_minute, 0))
+                       / nullif(sum(coalesce(workout_log_exercises.sets_completed, 0)), 0) AS calories_per_minute
+            FROM workout_log_exercises
+            JOIN exercise ON exercise.exercise_id = workout_log_exercises.exercise_id
+            GROUP BY 1
+        ) AS totals
+        WHERE workout_logs.id = totals.workout_log_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('workout_logs', 'estimated_calories')
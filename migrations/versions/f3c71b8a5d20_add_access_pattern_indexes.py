@@ -0,0 +1,52 @@
+"""add access pattern indexes
+
+Revision ID: f3c71b8a5d20
+Revises: e5a90c27d4b1
+Create Date: 2026-10-18 19:14:52.907341
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c71b8a5d20'
+down_revision: Union[str, None] = 'e5a90c27d4b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, covered columns)
+INDEXES = [
+    ('ix_workout_logs_user_id_date_id', 'workout_logs', ['user_id', 'date', 'id'], ['duration', 'estimated_calories']),
+    ('ix_progress_user_id_date_id', 'progress', ['user_id', 'date', 'id'], ['weight', 'bmi', 'body_fat_percentage', 'muscle_mass']),
+    ('ix_workout_plan_exercises_day_id_order', 'workout_plan_exercises', ['workout_plan_day_id', 'order'], []),
+    ('ix_workout_plan_days_week_id_day_of_week', 'workout_plan_days', ['workout_plan_week_id', 'day_of_week'], []),
+    ('ix_workout_plan_weeks_plan_id_week_number', 'workout_plan_weeks', ['workout_plan_id', 'week_number'], []),
+    ('ix_workout_log_exercises_workout_log_id', 'workout_log_exercises', ['workout_log_id'], []),
+]
+# Single-column indexes made redundant by the composites above, which lead with the same column
+REDUNDANT_INDEXES = [
+    ('ix_workout_logs_user_id', 'workout_logs', ['user_id']),
+    ('ix_progress_user_id', 'progress', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run inside a
+    # transaction. If a build fails it leaves an INVALID index behind; drop it
+    # before running the upgrade again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_include=include, postgresql_concurrently=True)
+        for name, table, _ in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
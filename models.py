@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Date, Float, Integer, String, ForeignKey, DATE, BigInteger, TIMESTAMP, Text, func
+from sqlalchemy import Boolean, Column, Date, Float, Integer, String, ForeignKey, DATE, BigInteger, TIMESTAMP, Text, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from db.database import Base
@@ -54,32 +54,41 @@ class WorkoutPlan(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     
-    weeks_schedule = relationship("WorkoutPlanWeek", back_populates="workout_plan", cascade="all, delete-orphan")
+    weeks_schedule = relationship("WorkoutPlanWeek", back_populates="workout_plan", cascade="all, delete-orphan", order_by="WorkoutPlanWeek.week_number")
     workout_logs = relationship("WorkoutLog", back_populates="workout_plan", cascade="all, delete-orphan")
 
 
 class WorkoutPlanWeek(Base):
     __tablename__ = "workout_plan_weeks"
+    __table_args__ = (
+        Index("ix_workout_plan_weeks_plan_id_week_number", "workout_plan_id", "week_number"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     workout_plan_id = Column(Integer, ForeignKey("workout_plans.id", ondelete="CASCADE"), nullable=False)
     week_number = Column(Integer, nullable=False)
     
     workout_plan = relationship("WorkoutPlan", back_populates="weeks_schedule")
-    days_schedule = relationship("WorkoutPlanDay", back_populates="week", cascade="all, delete-orphan")
+    days_schedule = relationship("WorkoutPlanDay", back_populates="week", cascade="all, delete-orphan", order_by="WorkoutPlanDay.id")
 
 class WorkoutPlanDay(Base):
     __tablename__ = "workout_plan_days"
+    __table_args__ = (
+        Index("ix_workout_plan_days_week_id_day_of_week", "workout_plan_week_id", "day_of_week"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     workout_plan_week_id = Column(Integer, ForeignKey("workout_plan_weeks.id", ondelete="CASCADE"), nullable=False)
     day_of_week = Column(String, nullable=False)
     
     week = relationship("WorkoutPlanWeek", back_populates="days_schedule")
-    exercises = relationship("WorkoutPlanExercise", back_populates="day", cascade="all, delete-orphan")
+    exercises = relationship("WorkoutPlanExercise", back_populates="day", cascade="all, delete-orphan", order_by="WorkoutPlanExercise.order")
 
 class WorkoutPlanExercise(Base):
     __tablename__ = "workout_plan_exercises"
+    __table_args__ = (
+        Index("ix_workout_plan_exercises_day_id_order", "workout_plan_day_id", "order"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     exercise_id = Column(Integer, ForeignKey("exercise.exercise_id",ondelete="CASCADE"), nullable=False)
@@ -93,22 +102,34 @@ class WorkoutPlanExercise(Base):
 
 class WorkoutLog(Base):
     __tablename__ = "workout_logs"
+    __table_args__ = (
+        # Newest-first pages and the weekly/monthly summary, which reads only the included totals
+        Index(
+            "ix_workout_logs_user_id_date_id", "user_id", "date", "id",
+            postgresql_include=["duration", "estimated_calories"]
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     # Remove ForeignKey constraint, just use UUID column
-    user_id = Column(UUID(as_uuid=True), nullable=False, unique=True, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
     
     workout_plan_id = Column(Integer, ForeignKey("workout_plans.id",ondelete="CASCADE"), nullable=False)
     date = Column(TIMESTAMP, server_default=func.now())
     status = Column(String, server_default="completed")
     duration = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
+    # Computed from the logged exercises when they are written
+    estimated_calories = Column(Float, nullable=False, server_default="0")
     
     workout_plan = relationship("WorkoutPlan", back_populates="workout_logs")
     exercises = relationship("WorkoutLogExercise", back_populates="workout_log", cascade="all, delete-orphan")
 
 class WorkoutLogExercise(Base):
     __tablename__ = "workout_log_exercises"
+    __table_args__ = (
+        Index("ix_workout_log_exercises_workout_log_id", "workout_log_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     workout_log_id = Column(Integer, ForeignKey("workout_logs.id",ondelete="CASCADE"), nullable=False)
@@ -121,10 +142,17 @@ class WorkoutLogExercise(Base):
 
 class Progress(Base):
     __tablename__ = "progress"
+    __table_args__ = (
+        # Newest-first pages, and index-only scans for the bucketed analytics
+        Index(
+            "ix_progress_user_id_date_id", "user_id", "date", "id",
+            postgresql_include=["weight", "bmi", "body_fat_percentage", "muscle_mass"]
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     # Remove ForeignKey constraint, just use UUID column
-    user_id = Column(UUID(as_uuid=True), nullable=False,index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
     
     date = Column(Date, nullable=False)
     weight = Column(Float, nullable=False)
@@ -132,3 +160,26 @@ class Progress(Base):
     body_fat_percentage = Column(Float, nullable=True)
     muscle_mass = Column(Float, nullable=True)
     notes = Column(String, nullable=True)
+
+class TrainingVolume(Base):
+    """Weekly training volume per muscle group, kept up to date as log exercises are written"""
+    __tablename__ = "training_volume"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    muscle_group = Column(String, primary_key=True)
+    sets = Column(Integer, nullable=False, default=0)
+    reps = Column(Integer, nullable=False, default=0)
+    tonnage = Column(Float, nullable=False, default=0)
+
+class PersonalRecord(Base):
+    """A user's best lifts for one exercise, kept up to date as log exercises are written"""
+    __tablename__ = "personal_records"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercise.exercise_id",ondelete="CASCADE"), primary_key=True)
+    max_weight = Column(Float, nullable=True)
+    max_weight_reps = Column(Integer, nullable=True)
+    max_reps = Column(Integer, nullable=True)
+    estimated_one_rep_max = Column(Float, nullable=True)
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
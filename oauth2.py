@@ -1,7 +1,9 @@
+import asyncio
+import time
 from datetime import timedelta,datetime,timezone
-from typing import Annotated
+from typing import Annotated, Any
 import jwt
-from jwt.exceptions import InvalidTokenError
+from jwt.exceptions import InvalidTokenError, PyJWKClientError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,6 +13,10 @@ from config import Config
 import os
 from supabase import create_client, Client
 
+import schemas
+from utils.cache import LocalCache
+from utils.logger import setup_logger
+
 
 SECRET_KEY = Config.SECRET_KEY
 TOKEN_EXPIRES_IN = 30
@@ -23,6 +29,56 @@ SUPABASE_URL = Config.SUPABASE_URL
 SUPABASE_KEY = Config.SUPABASE_KEY
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+logger = setup_logger("oauth2")
+
+# Minimum gap between JWKS refetches triggered by an unknown `kid`, so forged
+# headers can't turn every request into a call to Supabase.
+JWKS_MIN_REFRESH = 30
+
+
+class KeyUnavailableError(Exception):
+    """No local key can check this token (missing secret or JWKS unreachable)."""
+
+
+class SigningKeys:
+    """Supabase's JSON Web Key Set, held in memory and refreshed every `ttl` seconds."""
+
+    def __init__(self, url: str, ttl: int):
+        self.ttl = ttl
+        self._client = jwt.PyJWKClient(url, cache_jwk_set=False, timeout=5)
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def get(self, kid: str | None) -> jwt.PyJWK | None:
+        if self._needs_refresh(kid):
+            async with self._lock:
+                # Another request may have refreshed while we waited for the lock
+                if self._needs_refresh(kid):
+                    await self._refresh()
+        return self._keys.get(kid)
+
+    def _needs_refresh(self, kid):
+        age = time.monotonic() - self._fetched_at
+        return age > self.ttl or (kid not in self._keys and age > JWKS_MIN_REFRESH)
+
+    async def _refresh(self):
+        try:
+            # PyJWKClient fetches with urllib, so keep it off the event loop
+            jwk_set = await asyncio.to_thread(self._client.get_jwk_set, True)
+            self._keys = {key.key_id: key for key in jwk_set.keys}
+            self._fetched_at = time.monotonic()
+        except PyJWKClientError as e:
+            # Keep serving the keys we have and retry after JWKS_MIN_REFRESH
+            logger.warning(f"Could not refresh JWKS: {e}")
+            self._fetched_at = time.monotonic() - self.ttl + JWKS_MIN_REFRESH
+
+
+signing_keys = SigningKeys(Config.SUPABASE_JWKS_URL, Config.JWKS_CACHE_TTL) if Config.SUPABASE_JWKS_URL else None
+
+# Verified tokens, each evicted at its own `exp`
+verified_tokens = LocalCache(Config.AUTH_TOKEN_CACHE_SIZE, ttl=3600)
+
 def create_access_token(data:dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=TOKEN_EXPIRES_IN)
@@ -54,6 +110,32 @@ def verify_access_token(token:str,credentials_exception):
         
 
 
+async def verify_supabase_token(token: str) -> dict[str, Any]:
+    """Check a Supabase access token's signature and claims without calling Supabase.
+
+    HS256 tokens are checked against SUPABASE_JWT_SECRET; asymmetric tokens
+    against the project's JWKS. Raises KeyUnavailableError if neither applies.
+    """
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") == "HS256":
+        if not Config.SUPABASE_JWT_SECRET:
+            raise KeyUnavailableError("SUPABASE_JWT_SECRET is not configured")
+        key, algorithm = Config.SUPABASE_JWT_SECRET, "HS256"
+    else:
+        signing_key = await signing_keys.get(header.get("kid")) if signing_keys else None
+        if signing_key is None:
+            raise KeyUnavailableError(f"No signing key for kid {header.get('kid')}")
+        # Trust the algorithm published with the key, never the token header
+        key, algorithm = signing_key.key, signing_key.algorithm_name
+    return jwt.decode(
+        token,
+        key=key,
+        algorithms=[algorithm],
+        audience=Config.SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     try:
         credentials_exception = HTTPException(
@@ -61,16 +143,38 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
                 )
-        
-        # Use Supabase to get user from the token
-        print(f"Token received: {token}")
-        user_response =   supabase.auth.get_user(token)
-        
-        if user_response.user is None:
-            raise credentials_exception
-        print(f"User id  fetched from Supabase: {user_response.user.id}")
-        # Supabase user object can be returned directly or mapped to a local user schema if needed
-        return user_response.user
+
+        user = verified_tokens.get(token)
+        if user is not None:
+            return user
+
+        try:
+            payload = await verify_supabase_token(token)
+            user = schemas.CurrentUser(id=payload["sub"], email=payload.get("email"), role=payload.get("role"))
+        except KeyUnavailableError as e:
+            if not Config.AUTH_REMOTE_FALLBACK:
+                logger.error(str(e))
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Token verification is unavailable")
+            # Supabase does the verification; the claims are only read for `exp`
+            user_response = await asyncio.to_thread(supabase.auth.get_user, token)
+            if user_response is None or user_response.user is None:
+                raise credentials_exception
+            remote_user = user_response.user
+            user = schemas.CurrentUser(id=remote_user.id, email=remote_user.email, role=remote_user.role)
+            payload = jwt.decode(token, options={"verify_signature": False})
+
+        expires_in = payload.get("exp", 0) - time.time()
+        if expires_in > 0:
+            verified_tokens.set(token, user, ex=expires_in)
+        return user
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except InvalidTokenError:
+        raise credentials_exception
     except HTTPException as http_exec:
         raise http_exec
     except Exception as e:
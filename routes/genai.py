@@ -1,20 +1,30 @@
 from typing import List
 from fastapi import APIRouter,HTTPException,status,Depends, Request
-from sqlalchemy import select
-from db.database import get_db
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import insert, select
+from db.database import get_db, sessionmanger
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 import models
 from oauth2 import get_current_user
 from utils.logger import setup_logger
+from utils.llm import llm_limiter, LLMQueueTimeout, JsonArrayStreamParser, validate_schema
+from utils.cache import cache
+from utils.catalog import exercise_catalog
+from utils.intent import classify_intent, intent_sources, normalize_query
+from utils.jobs import job_queue, JobQueueFull
 import schemas
 from config import Config
 
 import vertexai
 from vertexai.generative_models import GenerativeModel,GenerationConfig
+from google.api_core import exceptions as google_exceptions
 from datetime import datetime
-from functools import lru_cache
+import asyncio
+import hashlib
 import json
+import time
+import orjson
 
 genai_route = APIRouter(prefix='/genai')
 logger = setup_logger("genai_route")
@@ -29,26 +39,48 @@ async def generate(request:Request,db:AsyncSession= Depends(get_db),current_user
     try:
         user_data =await request.json()
         user_query = user_data['query']
+        force_refresh = bool(user_data.get('force_refresh', False))
+        stream = bool(user_data.get('stream', False)) or "text/event-stream" in request.headers.get("accept", "")
+        run_async = user_data.get('mode') == "async"
         if user_query is None or user_query == "":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Query not found in request")
 
-        intent = get_intent(user_query)
-        print("Intent: ",intent)
-
         user_profile = (await db.scalars(select(models.UserProfile).where(models.UserProfile.user_id == current_user.id)
                               )).first() 
         if user_profile is None:
             logger.warning(f"No profile found for user with id {current_user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No profile found for user with id {current_user.id}")
+        # Hand the connection back before any model call; the save checks one out again
+        await db.close()
+
+        if stream:
+            return StreamingResponse(
+                stream_generate(current_user,user_query,user_profile,force_refresh),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
+        intent = await get_intent(user_query)
+        logger.info(f"Intent: {intent}")
+
+        if 'workout plan generation' in intent.lower() and run_async:
+            try:
+                job_id = await job_queue.submit(
+                    current_user.id, generate_plan_job, current_user, user_profile, force_refresh,
+                    is_transient=is_transient_error,
+                )
+            except JobQueueFull as e:
+                logger.warning(str(e))
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,detail="Plan generation is busy, please retry shortly")
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"intent":intent,"job_id":job_id,"status":"queued","status_url":f"/api/genai/jobs/{job_id}"},
+            )
         if 'workout plan generation' in intent.lower():
-            print("Generating workout plan....")
-            workout_plan = generate_workout_plan(db,user_profile)
-            workout_plan_data = json.loads(workout_plan)
-            print("Plan: ",workout_plan_data)
-            print("Saving workout plan to database....")
-            await save_workout_plan_db(db,current_user,workout_plan_data)
-            return {"intent":intent,"workout_plan":workout_plan_data}
+            workout_plan_data = await get_workout_plan_data(await load_catalog(),user_profile,force_refresh)
+            logger.info("Saving workout plan to database")
+            workout_plan_id = await save_workout_plan_db(db,current_user,workout_plan_data)
+            return {"intent":intent,"workout_plan_id":workout_plan_id,"workout_plan":workout_plan_data}
         else:
             return {"intent":intent}
             
@@ -62,36 +94,132 @@ async def generate(request:Request,db:AsyncSession= Depends(get_db),current_user
 
 
 
-def get_intent(query:str):
+@genai_route.get('/jobs/{job_id}')
+async def get_job(job_id:str,current_user:dict = Depends(get_current_user)):
+    job = await job_queue.get(job_id)
+    if job is None or job.get("user_id") != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No job with id {job_id}")
+    return job
+
+
+async def generate_plan_job(current_user:dict,profile:models.UserProfile,force_refresh:bool=False) -> dict:
+    """Background body of an async /genai/generate request; only the catalog load and the save hold a connection."""
+    workout_plan_data = await get_workout_plan_data(await load_catalog(),profile,force_refresh)
+    async with sessionmanger.session() as db:
+        workout_plan_id = await save_workout_plan_db(db,current_user,workout_plan_data)
+    return {"workout_plan_id": workout_plan_id}
+
+
+async def load_catalog():
+    """The exercise catalog, reloaded if stale on a session that is closed straight away."""
+    async with sessionmanger.session() as db:
+        return await exercise_catalog.get(db)
+
+
+def is_transient_error(e:Exception) -> bool:
+    """Errors worth retrying: model overload, limiter queue timeouts and deadlines."""
+    return isinstance(e, HTTPException) and e.status_code in (status.HTTP_503_SERVICE_UNAVAILABLE, status.HTTP_504_GATEWAY_TIMEOUT)
+
+
+async def get_intent(query:str):
+    """
+    Classify the query, asking the model only when the keyword rules can't.
+
+    Model answers are cached by normalized query text, so a repeated
+    ambiguous query costs a single cache read.
+    """
+    start = time.perf_counter()
+    source = "rules"
+    intent = classify_intent(query)
+    if intent is None:
+        cache_key = f"genai:intent:{hashlib.sha1(normalize_query(query).encode()).hexdigest()}"
+        source = "cache"
+        intent = await cache.get(cache_key, local=True)
+        if intent is None:
+            source = "llm"
+            intent = await classify_intent_llm(query)
+            await cache.set(cache_key, intent, ex=Config.INTENT_CACHE_TTL, local=True)
+    intent_sources[source] += 1
+    logger.info(f"Intent '{intent}' decided by {source} in {(time.perf_counter() - start) * 1000:.2f}ms")
+    return intent
+
+
+async def classify_intent_llm(query:str):
     try:
         prompt = f"""You are an expert who can generate user's intent from their query. Your task is to generate the intent for the following query: {query} \n
                      The intent should belong from the following categories: \n
                      1. QnA with assistant \n
                      2. Workout Plan Generation \n
                      Return only the intent and not the full response."""
-        response = model.generate_content(
-            [prompt]
-        )
-        return response.text
+        response = await llm_limiter.generate(model, [prompt], timeout=Config.GENAI_INTENT_TIMEOUT)
+        return response.text.strip()
+    except LLMQueueTimeout as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,detail="Plan generation is busy, please retry shortly")
+    except TimeoutError:
+        logger.error("Intent classification timed out")
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT,detail="Intent classification timed out")
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=str(e))
     
 
-def generate_workout_plan(db:AsyncSession,profile:models.UserProfile):
-    try:
-        user_preferences = {
-        "age": datetime.now().year - profile.date_of_birth.year,
-        "gender": profile.gender,
-        "fitness_goal": profile.fitness_goal,
-        "fitness_level": profile.fitness_level,
-        "available_time": profile.available_time,
+# Upper bounds of the age and session-length bands profiles are grouped into
+AGE_BAND_EDGES = (17, 24, 34, 44, 54, 64)
+TIME_BAND_EDGES = (30, 45, 60, 90)
+
+
+def _band(value:int | None, edges:tuple) -> str:
+    if value is None:
+        return "any"
+    lower = 0
+    for upper in edges:
+        if value <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def get_user_preferences(profile:models.UserProfile) -> dict:
+    """
+    Profile features the plan prompt is built from, bucketed so that users with
+    near-identical profiles produce the same prompt and can share a plan.
+    """
+    return {
+        "age": _band(datetime.now().year - profile.date_of_birth.year, AGE_BAND_EDGES),
+        "gender": (profile.gender or "Not Specified").strip().lower(),
+        "fitness_goal": (profile.fitness_goal or "general fitness").strip().lower(),
+        "fitness_level": (profile.fitness_level or "beginner").strip().lower(),
+        "available_time": _band(profile.available_time, TIME_BAND_EDGES),
         "duration_weeks": 4  # Default
     }
-        
-        exercise_data = get_exercise_json(db)
 
-        prompt = f"""
+
+async def get_workout_plan_data(catalog,profile:models.UserProfile,force_refresh:bool=False) -> dict:
+    """
+    Plan template for the user's profile bucket, generated only on a cache miss.
+
+    Templates are keyed by the bucketed preferences and the exercise catalog
+    version, so a catalog change never serves plans with stale exercise ids.
+    `force_refresh` skips the lookup and replaces the cached template.
+    """
+    user_preferences = get_user_preferences(profile)
+    cache_key = plan_template_key(catalog,user_preferences)
+    if not force_refresh:
+        cached_plan = await cache.get(cache_key)
+        if cached_plan is not None:
+            logger.info(f"Using cached plan template {cache_key}")
+            return orjson.loads(cached_plan)
+
+    logger.info("Generating workout plan")
+    workout_plan = await generate_workout_plan(catalog,user_preferences)
+    workout_plan_data = orjson.loads(workout_plan)
+    await cache.set(cache_key, workout_plan, ex=Config.PLAN_TEMPLATE_CACHE_TTL)
+    return workout_plan_data
+
+
+def build_plan_prompt(catalog,user_preferences:dict) -> str:
+    return f"""
                     Generate a {user_preferences['duration_weeks']}-week structured workout plan for a {user_preferences['age']}-year-old {user_preferences['gender']}.
                     - Goal: {user_preferences['fitness_goal']}
                     - Fitness Level: {user_preferences['fitness_level']}
@@ -133,7 +261,7 @@ def generate_workout_plan(db:AsyncSession,profile:models.UserProfile):
 
                         **Exercise**:
 
-                        For exercise id details refer to this exercise table data : {exercise_data} \n
+                        For exercise id details refer to this exercise table data : {catalog.prompt_json} \n
                         If the exercise doesn't need reps, set reps to 0.
 
                         Expected Output:
@@ -169,72 +297,298 @@ def generate_workout_plan(db:AsyncSession,profile:models.UserProfile):
                         ]
                     }}
                     """
-        response = model.generate_content(
-            [prompt],
-            generation_config=GenerationConfig(
-                temperature = 0.4,
-                max_output_tokens = 8192,
-                response_mime_type="application/json",
-                response_schema=response_schema
-            )
+
+
+def plan_generation_config() -> GenerationConfig:
+    return GenerationConfig(
+        temperature = 0.4,
+        max_output_tokens = 8192,
+        response_mime_type="application/json",
+        response_schema=response_schema
+    )
+
+
+def plan_template_key(catalog,user_preferences:dict) -> str:
+    bucket = hashlib.sha1(json.dumps(user_preferences, sort_keys=True).encode()).hexdigest()[:16]
+    return f"genai:plan:{catalog.version}:{bucket}"
+
+
+def _sse(event:str,data:dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+async def stream_generate(current_user:dict,query:str,profile:models.UserProfile,force_refresh:bool=False):
+    """
+    Server-Sent Events for /genai/generate.
+
+    Emits `intent` as soon as it is known, one `week` event per week as soon as
+    the model has produced it (or straight from a cached template), then
+    `done` with the saved plan's id. Failures after the stream has started
+    arrive as an `error` event, since the status line has already been sent.
+    """
+    yield ": stream open\n\n"  # first byte goes out before any classification work
+    try:
+        intent = await get_intent(query)
+        yield _sse("intent", {"intent": intent})
+        if 'workout plan generation' not in intent.lower():
+            yield _sse("done", {"intent": intent})
+            return
+
+        # No connection is held while the model streams: the catalog is read on
+        # a short session of its own and the save opens a fresh one.
+        user_preferences = get_user_preferences(profile)
+        catalog = await load_catalog()
+        cache_key = plan_template_key(catalog,user_preferences)
+        cached_plan = None if force_refresh else await cache.get(cache_key)
+
+        if cached_plan is not None:
+            workout_plan_data = orjson.loads(cached_plan)
+            for week in workout_plan_data['weeks']:
+                yield _sse("week", week)
+        elif Config.GENAI_PLAN_PARALLEL:
+            skeleton = await generate_plan_skeleton(user_preferences)
+            weeks = []
+            async for week in iter_plan_weeks(catalog,user_preferences,skeleton):
+                weeks.append(week)
+                yield _sse("week", week)
+            workout_plan_data = merge_plan(skeleton,weeks)
+            await cache.set(cache_key, orjson.dumps(workout_plan_data), ex=Config.PLAN_TEMPLATE_CACHE_TTL)
+        else:
+            parser = JsonArrayStreamParser("weeks")
+            async for text in llm_limiter.stream(
+                model,
+                [build_plan_prompt(catalog,user_preferences)],
+                timeout=Config.GENAI_PLAN_TIMEOUT,
+                generation_config=plan_generation_config()
+            ):
+                for week in parser.feed(text):
+                    yield _sse("week", week)
+            workout_plan_data = orjson.loads(parser.text)
+            await cache.set(cache_key, parser.text, ex=Config.PLAN_TEMPLATE_CACHE_TTL)
+
+        async with sessionmanger.session() as db:
+            workout_plan_id = await save_workout_plan_db(db,current_user,workout_plan_data)
+        yield _sse("done", {
+            "workout_plan_id": workout_plan_id,
+            "name": workout_plan_data['name'],
+            "description": workout_plan_data['description'],
+        })
+    except HTTPException as http_exec:
+        yield _sse("error", {"status_code": http_exec.status_code, "detail": http_exec.detail})
+    except LLMQueueTimeout as e:
+        logger.warning(str(e))
+        yield _sse("error", {"status_code": status.HTTP_503_SERVICE_UNAVAILABLE, "detail": "Plan generation is busy, please retry shortly"})
+    except TimeoutError:
+        logger.error("Workout plan generation timed out")
+        yield _sse("error", {"status_code": status.HTTP_504_GATEWAY_TIMEOUT, "detail": "Workout plan generation timed out"})
+    except Exception as e:
+        logger.error(str(e))
+        yield _sse("error", {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": str(e)})
+
+
+async def generate_workout_plan(catalog,user_preferences:dict):
+    try:
+        if Config.GENAI_PLAN_PARALLEL:
+            skeleton = await generate_plan_skeleton(user_preferences)
+            weeks = [week async for week in iter_plan_weeks(catalog,user_preferences,skeleton)]
+            return orjson.dumps(merge_plan(skeleton,weeks))
+        response = await llm_limiter.generate(
+            model,
+            [build_plan_prompt(catalog,user_preferences)],
+            timeout=Config.GENAI_PLAN_TIMEOUT,
+            generation_config=plan_generation_config()
         )
 
         return response.text
+    except LLMQueueTimeout as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,detail="Plan generation is busy, please retry shortly")
+    except TimeoutError:
+        logger.error("Workout plan generation timed out")
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT,detail="Workout plan generation timed out")
+    except (google_exceptions.ServiceUnavailable, google_exceptions.ResourceExhausted, google_exceptions.InternalServerError) as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,detail="Model is temporarily unavailable, please retry shortly")
+    except HTTPException as http_exec:
+        raise http_exec
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=str(e))
         
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+async def generate_plan_skeleton(user_preferences:dict) -> dict:
+    """
+    Name, description and a one-line focus per week, without any exercises.
+
+    The outline is small, so this call returns quickly and gives every week
+    the same context before they are generated in parallel.
+    """
+    response = await llm_limiter.generate(
+        model,
+        [build_skeleton_prompt(user_preferences)],
+        timeout=Config.GENAI_WEEK_TIMEOUT,
+        generation_config=GenerationConfig(
+            temperature = 0.4,
+            max_output_tokens = 1024,
+            response_mime_type="application/json",
+            response_schema=skeleton_schema
+        )
+    )
+    skeleton = orjson.loads(response.text)
+    validate_schema(skeleton,skeleton_schema)
+    return skeleton
+
+
+async def generate_plan_week(catalog,user_preferences:dict,skeleton:dict,week_number:int) -> dict:
+    """One week of the plan, validated on its own and regenerated once if it doesn't match the schema."""
+    for attempt in range(2):
+        response = await llm_limiter.generate(
+            model,
+            [build_week_prompt(catalog,user_preferences,skeleton,week_number)],
+            timeout=Config.GENAI_WEEK_TIMEOUT,
+            generation_config=GenerationConfig(
+                temperature = 0.4,
+                max_output_tokens = 4096,
+                response_mime_type="application/json",
+                response_schema=week_schema
+            )
+        )
+        try:
+            week = orjson.loads(response.text)
+            validate_schema(week,week_schema)
+        except ValueError as e:
+            if attempt:
+                raise
+            logger.warning(f"Week {week_number} rejected ({e}); regenerating")
+            continue
+        week['week_number'] = week_number
+        return week
+
+
+async def iter_plan_weeks(catalog,user_preferences:dict,skeleton:dict):
+    """
+    Generate every week of `skeleton` concurrently and yield each one as it finishes.
+
+    The weeks share the model limiter with other requests, so a plan takes
+    about ceil(weeks / GENAI_MAX_CONCURRENCY) week-long calls rather than
+    one call per week. Weeks still pending are cancelled if one fails or the
+    caller stops iterating.
+    """
+    tasks = [
+        asyncio.ensure_future(generate_plan_week(catalog,user_preferences,skeleton,week_number))
+        for week_number in range(1, user_preferences['duration_weeks'] + 1)
+    ]
+    try:
+        for next_week in asyncio.as_completed(tasks):
+            yield await next_week
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def merge_plan(skeleton:dict,weeks:List[dict]) -> dict:
+    return {
+        "name": skeleton['name'],
+        "description": skeleton['description'],
+        "weeks": sorted(weeks, key=lambda week: week['week_number']),
+    }
 
 
-@lru_cache(maxsize=128)
-async def get_exercise_json(db:AsyncSession):
-    try:
-        # exercises = db.query(models.Exercise).all()
-        exercises = (await db.scalars(select(models.Exercise))).all()
-        data = [row.__dict__ for row in exercises]
+def build_skeleton_prompt(user_preferences:dict) -> str:
+    return f"""
+                    Outline a {user_preferences['duration_weeks']}-week structured workout plan for a {user_preferences['age']}-year-old {user_preferences['gender']}.
+                    - Goal: {user_preferences['fitness_goal']}
+                    - Fitness Level: {user_preferences['fitness_level']}
+                    - Available Time: {user_preferences['available_time']} minutes per session
+                    Return the plan's name, a brief description, and for each week from 1 to {user_preferences['duration_weeks']}
+                    its week_number and a one-sentence focus describing how it progresses from the previous week.
+                    Do not list exercises.
+                    """
 
-        for row in data:
-            row.pop('_sa_instance_state')
-        
-        return json.dumps(data,cls=DateTimeEncoder)
-    except Exception as e:
-        logger.error(str(e))
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=str(e))
-    
 
-async def save_workout_plan_db(db:AsyncSession,current_user:dict,workout_plan_data:dict):
+def build_week_prompt(catalog,user_preferences:dict,skeleton:dict,week_number:int) -> str:
+    outline = "\n".join(f"Week {week['week_number']}: {week['focus']}" for week in skeleton['weeks'])
+    return f"""
+                    You are writing week {week_number} of the {user_preferences['duration_weeks']}-week workout plan "{skeleton['name']}": {skeleton['description']}
+                    The user is a {user_preferences['age']}-year-old {user_preferences['gender']}.
+                    - Goal: {user_preferences['fitness_goal']}
+                    - Fitness Level: {user_preferences['fitness_level']}
+                    - Available Time: {user_preferences['available_time']} minutes per session
+                    - Include warm-ups, main workouts, and cooldowns.
+                    Plan outline:
+                    {outline}
+
+                    Return only week {week_number}: its week_number and the training days, each with day (e.g. Monday)
+                    and its exercises with exercise_id, sets, reps and order.
+                    For exercise id details refer to this exercise table data : {catalog.prompt_json} \n
+                    If the exercise doesn't need reps, set reps to 0.
+                    """
+
+
+async def save_workout_plan_db(db:AsyncSession,current_user:dict,workout_plan_data:dict) -> int:
+    """
+    Persist a generated plan tree in one transaction.
+
+    Each level (plan, weeks, days, exercises) is a single multi-row INSERT whose
+    RETURNING ids feed the next level, so the statement count stays constant
+    whatever the size of the plan. Exercises the catalog doesn't know are
+    dropped before anything is written.
+
+    Returns:
+        int: id of the new workout plan
+    """
     try:
-        workout_plan = models.WorkoutPlan(user_id=current_user.id,name=workout_plan_data['name'],description=workout_plan_data['description'],weeks=4)
-        db.add(workout_plan)
+        weeks = workout_plan_data['weeks']
+        exercise_ids = {int(exercise['exercise_id']) for week in weeks for day in week['days'] for exercise in day['exercises']}
+        known_ids = (await exercise_catalog.get(db)).ids
+        unknown_ids = exercise_ids - known_ids
+        if unknown_ids:
+            logger.warning(f"Dropping exercises missing from the catalog: {sorted(unknown_ids)}")
+
+        workout_plan_id = await db.scalar(
+            insert(models.WorkoutPlan)
+            .values(user_id=current_user.id,name=workout_plan_data['name'],description=workout_plan_data['description'],weeks=len(weeks))
+            .returning(models.WorkoutPlan.id)
+        )
+
+        week_ids = await _insert_returning_ids(db, models.WorkoutPlanWeek, [
+            {"workout_plan_id": workout_plan_id, "week_number": int(week['week_number'])} for week in weeks
+        ])
+
+        days = [(week_id, day) for week_id, week in zip(week_ids, weeks) for day in week['days']]
+        day_ids = await _insert_returning_ids(db, models.WorkoutPlanDay, [
+            {"workout_plan_week_id": week_id, "day_of_week": day['day']} for week_id, day in days
+        ])
+
+        exercise_rows = [
+            {
+                "workout_plan_day_id": day_id,
+                "exercise_id": int(exercise['exercise_id']),
+                "sets": int(exercise['sets']),
+                "reps": int(exercise['reps']),
+                "order": int(exercise['order']),
+            }
+            for day_id, (_, day) in zip(day_ids, days)
+            for exercise in day['exercises']
+            if int(exercise['exercise_id']) in known_ids
+        ]
+        if exercise_rows:
+            await db.execute(insert(models.WorkoutPlanExercise), exercise_rows)
+
         await db.commit()
-        await db.refresh(workout_plan)
-
-        for week in workout_plan_data['weeks']:
-            workout_plan_week = models.WorkoutPlanWeek(workout_plan_id=workout_plan.id,week_number=week['week_number'])
-            db.add(workout_plan_week)
-            await db.commit()
-            await db.refresh(workout_plan_week)
-
-            for day in week['days']:
-                workout_plan_day = models.WorkoutPlanDay(workout_plan_week_id=workout_plan_week.id,day_of_week=day['day'])
-                db.add(workout_plan_day)
-                await db.commit()
-                await db.refresh(workout_plan_day)
-
-                for exercise in day['exercises']:
-                    workout_plan_exercise = models.WorkoutPlanExercise(exercise_id=exercise['exercise_id'],workout_plan_day_id=workout_plan_day.id,sets=exercise['sets'],reps=exercise['reps'],order=exercise['order'])
-                    db.add(workout_plan_exercise)
-                    await db.commit()
-                    await db.refresh(workout_plan_exercise)
+        await cache.delete(f"user:{current_user.id}:workouts")
+        return workout_plan_id
     except Exception as e:
+        await db.rollback()
         logger.error(str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=str(e))
+
+
+async def _insert_returning_ids(db:AsyncSession,model,rows:List[dict]) -> List[int]:
+    """Multi-row INSERT returning the new ids in the same order as `rows`."""
+    if not rows:
+        return []
+    return list((await db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows)).all())
     
 
 response_schema = {
@@ -305,3 +659,39 @@ response_schema = {
   },
   "required": ["name", "description", "weeks"]
 }
+
+# Each week is generated against the week item of the full plan schema
+week_schema = response_schema["properties"]["weeks"]["items"]
+
+skeleton_schema = {
+  "type": "OBJECT",
+  "properties": {
+    "name": {
+      "type": "STRING",
+      "description": "The name of the workout plan."
+    },
+    "description": {
+      "type": "STRING",
+      "description": "A brief description of the workout plan."
+    },
+    "weeks": {
+      "type": "ARRAY",
+      "description": "One entry per week, in order.",
+      "items": {
+        "type": "OBJECT",
+        "properties": {
+          "week_number": {
+            "type": "NUMBER",
+            "description": "The sequential week number (e.g., 1, 2, 3)."
+          },
+          "focus": {
+            "type": "STRING",
+            "description": "What this week focuses on and how it progresses from the previous one."
+          }
+        },
+        "required": ["week_number", "focus"]
+      }
+    }
+  },
+  "required": ["name", "description", "weeks"]
+}
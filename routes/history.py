@@ -0,0 +1,289 @@
+import asyncio
+import csv
+import io
+import time
+import uuid
+from datetime import datetime, timezone
+from itertools import groupby, islice
+from typing import Iterator, Literal, Optional
+
+import orjson
+from fastapi import APIRouter,HTTPException,status,Depends,File,UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import models
+import schemas
+from config import Config
+from db.database import get_db, sessionmanger
+from oauth2 import get_current_user
+from utils.progress import progress_analytics_keys
+from utils.cache import cache
+from utils.catalog import exercise_catalog
+from utils.logger import setup_logger
+from utils.records import personal_records_key, rollup_personal_records
+from utils.volume import refresh_workout_log_totals, rollup_training_volume, training_volume_key, workout_summary_key
+
+history_route = APIRouter(prefix='/history')
+logger = setup_logger("history_route")
+
+PROGRESS_COLUMNS = ("user_id", "date", "weight", "bmi", "body_fat_percentage", "muscle_mass", "notes")
+WORKOUT_LOG_COLUMNS = ("id", "user_id", "workout_plan_id", "date", "duration", "notes")
+WORKOUT_LOG_EXERCISE_COLUMNS = ("workout_log_id", "exercise_id", "sets_completed", "reps_completed", "weight_used")
+# CSV columns that describe one exercise entry; the rest describe the session
+EXERCISE_FIELDS = ("exercise_id", "sets_completed", "reps_completed", "weight_used")
+# Exports use the same CSV layout imports accept
+PROGRESS_CSV_FIELDS = ("date", "weight", "bmi", "body_fat_percentage", "muscle_mass", "notes")
+WORKOUT_LOG_CSV_FIELDS = ("workout_plan_id", "date", "duration", "notes", *EXERCISE_FIELDS)
+EXPORT_BATCH_SIZE = 500
+
+
+@history_route.post('/import',response_model=schemas.ImportReport)
+async def import_history(
+    kind: Literal["progress", "workout_logs"],
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk import of past weigh-ins or workout sessions from a CSV or NDJSON file.
+
+    The file is read and validated IMPORT_BATCH_SIZE rows at a time and every
+    batch is loaded with Postgres COPY in its own transaction. Invalid rows, and
+    the rows of a batch the database refuses, are reported and skipped while
+    the rest of the import carries on. The user's list caches are invalidated
+    once, after the last batch.
+
+    Workout session CSVs have one row per exercise entry; consecutive rows with
+    the same workout_plan_id and date form one session. In NDJSON a session is
+    one object with an `exercises` array. The format is taken from the file
+    extension unless `format` is given.
+    """
+    start = time.perf_counter()
+    file_format = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    user_id = uuid.UUID(str(current_user.id))
+    report = {"kind": kind, "imported": 0, "rejected": 0, "errors": []}
+    try:
+        rows = read_csv(file.file) if file_format == "csv" else read_ndjson(file.file)
+        plan_ids, exercise_ids = set(), frozenset()
+        if kind == "workout_logs":
+            if file_format == "csv":
+                rows = group_csv_sessions(rows)
+            plan_ids = set((await db.scalars(select(models.WorkoutPlan.id).where(models.WorkoutPlan.user_id == current_user.id))).all())
+            exercise_ids = (await exercise_catalog.get(db)).ids
+
+        while batch := await asyncio.to_thread(lambda: list(islice(rows, Config.IMPORT_BATCH_SIZE))):
+            valid = []
+            for line, row in batch:
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    if kind == "progress":
+                        valid.append((line, schemas.CreateProgress.model_validate(row)))
+                    else:
+                        valid.append((line, validate_session(row, plan_ids, exercise_ids)))
+                except ValueError as e:
+                    reject(report, line, e)
+            if not valid:
+                continue
+
+            try:
+                if kind == "progress":
+                    await copy_progress(db, user_id, [item for _, item in valid])
+                else:
+                    await copy_workout_logs(db, user_id, [item for _, item in valid])
+                await db.commit()
+                report["imported"] += len(valid)
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Import batch of {len(valid)} rows rejected: {e}")
+                for line, _ in valid:
+                    reject(report, line, e)
+
+        seconds = time.perf_counter() - start
+        report["seconds"] = round(seconds, 3)
+        report["rows_per_second"] = round(report["imported"] / seconds, 1) if seconds else 0.0
+        logger.info(f"Imported {report['imported']} {kind} rows ({report['rejected']} rejected) in {seconds:.2f}s")
+        return report
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="File must be UTF-8 encoded")
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=str(e))
+    finally:
+        # One invalidation for the whole import, covering batches committed before any failure
+        if report["imported"] and kind == "workout_logs":
+            await cache.delete(
+                f"workout_logs_user_{current_user.id}",
+                training_volume_key(current_user.id),
+                workout_summary_key(current_user.id),
+                personal_records_key(current_user.id)
+            )
+        elif report["imported"]:
+            await cache.delete(f"progress_user_{current_user.id}", *progress_analytics_keys(current_user.id))
+
+
+@history_route.get('/export')
+async def export_history(
+    kind: Literal["progress", "workout_logs"],
+    format: Literal["csv", "ndjson"] = "ndjson",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download the user's whole history of weigh-ins or workout sessions.
+
+    Rows are read through a server-side cursor EXPORT_BATCH_SIZE at a time and
+    each batch is written out before the next is fetched, so memory stays flat
+    however long the history is. NDJSON sessions carry their exercises in an
+    `exercises` array; CSV uses one row per exercise entry, the layout
+    /history/import reads.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{kind}.{format}"
+    return StreamingResponse(
+        stream_export(current_user, kind, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def stream_export(current_user: dict, kind: str, file_format: str):
+    if kind == "progress":
+        query = (select(models.Progress).where(models.Progress.user_id == current_user.id)
+                 .order_by(models.Progress.date, models.Progress.id))
+        schema, csv_fields = schemas.DisplayProgress, PROGRESS_CSV_FIELDS
+    else:
+        query = (select(models.WorkoutLog).where(models.WorkoutLog.user_id == current_user.id)
+                 .options(selectinload(models.WorkoutLog.exercises))
+                 .order_by(models.WorkoutLog.date, models.WorkoutLog.id))
+        schema, csv_fields = schemas.DisplayWorkoutSession, WORKOUT_LOG_CSV_FIELDS
+
+    if file_format == "csv":
+        yield ",".join(csv_fields) + "\r\n"
+
+    # The request's session is closed once the handler returns, so the
+    # stream opens its own.
+    async with sessionmanger.session() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            rows = [schema.model_validate(row) for row in partition]
+            if file_format == "csv":
+                yield to_csv(rows, csv_fields)
+            else:
+                yield b"".join(row.model_dump_json().encode() + b"\n" for row in rows)
+
+
+def to_csv(rows: list, fields: tuple) -> str:
+    """CSV lines for `rows`; a workout session becomes one line per exercise entry."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    for row in rows:
+        record = row.model_dump(mode="json")
+        exercises = record.pop("exercises", None)
+        if not exercises:
+            writer.writerow(record)
+        for exercise in exercises or ():
+            writer.writerow({**record, **exercise})
+    return buffer.getvalue()
+
+
+def read_csv(raw) -> Iterator[tuple[int, dict]]:
+    """(line, row) pairs; empty cells are left out so optional fields fall back to their defaults."""
+    reader = csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+
+
+def read_ndjson(raw) -> Iterator[tuple[int, dict | Exception]]:
+    """(line, object) pairs; a line that isn't valid JSON yields the parse error instead."""
+    for line, text in enumerate(io.TextIOWrapper(raw, encoding="utf-8-sig"), start=1):
+        if not text.strip():
+            continue
+        try:
+            yield line, orjson.loads(text)
+        except orjson.JSONDecodeError as e:
+            yield line, ValueError(f"Invalid JSON: {e}")
+
+
+def group_csv_sessions(rows: Iterator[tuple[int, dict]]) -> Iterator[tuple[int, dict]]:
+    """Fold consecutive exercise rows of the same session into one session object."""
+    for _, group in groupby(rows, key=lambda item: (item[1].get("workout_plan_id"), item[1].get("date"))):
+        group = list(group)
+        line, first = group[0]
+        session = {key: value for key, value in first.items() if key not in EXERCISE_FIELDS}
+        session["exercises"] = [
+            {key: row[key] for key in EXERCISE_FIELDS if key in row}
+            for _, row in group if "exercise_id" in row
+        ]
+        yield line, session
+
+
+def validate_session(row: dict, plan_ids: set, exercise_ids: frozenset) -> schemas.ImportWorkoutLog:
+    session = schemas.ImportWorkoutLog.model_validate(row)
+    if session.workout_plan_id not in plan_ids:
+        raise ValueError(f"workout_plan_id: no workout plan with id {session.workout_plan_id}")
+    unknown = {exercise.exercise_id for exercise in session.exercises} - exercise_ids
+    if unknown:
+        raise ValueError(f"exercise_id: unknown exercises {sorted(unknown)}")
+    return session
+
+
+def reject(report: dict, line: int, error: Exception):
+    report["rejected"] += 1
+    if len(report["errors"]) < Config.IMPORT_MAX_REPORTED_ERRORS:
+        if isinstance(error, ValidationError):
+            message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+        else:
+            message = str(error)
+        report["errors"].append({"line": line, "error": message})
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored without a time zone, in UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+async def copy_records(db: AsyncSession, table: str, columns: tuple, records: list):
+    """COPY `records` into `table` on the session's connection, inside its transaction."""
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(table, columns=columns, records=records)
+
+
+async def copy_progress(db: AsyncSession, user_id: uuid.UUID, entries: list[schemas.CreateProgress]):
+    await copy_records(db, models.Progress.__tablename__, PROGRESS_COLUMNS, [
+        (user_id, entry.date.date(), entry.weight, entry.bmi, entry.body_fat_percentage, entry.muscle_mass, entry.notes)
+        for entry in entries
+    ])
+
+
+async def copy_workout_logs(db: AsyncSession, user_id: uuid.UUID, sessions: list[schemas.ImportWorkoutLog]):
+    """
+    COPY sessions and their exercises.
+
+    Log ids are drawn from the table's sequence up front so the exercise rows
+    can reference them without a RETURNING round trip per session. The logs'
+    calorie and active time totals, the weekly volume rollup and the personal
+    records are then updated with one statement each.
+    """
+    sequence = func.pg_get_serial_sequence(models.WorkoutLog.__tablename__, "id")
+    log_ids = (await db.scalars(select(func.nextval(sequence)).select_from(func.generate_series(1, len(sessions))))).all()
+    await copy_records(db, models.WorkoutLog.__tablename__, WORKOUT_LOG_COLUMNS, [
+        (log_id, user_id, session.workout_plan_id, _naive_utc(session.date), session.duration, session.notes)
+        for log_id, session in zip(log_ids, sessions)
+    ])
+    exercise_rows = [
+        (log_id, exercise.exercise_id, exercise.sets_completed, exercise.reps_completed, exercise.weight_used)
+        for log_id, session in zip(log_ids, sessions)
+        for exercise in session.exercises
+    ]
+    if exercise_rows:
+        await copy_records(db, models.WorkoutLogExercise.__tablename__, WORKOUT_LOG_EXERCISE_COLUMNS, exercise_rows)
+        await refresh_workout_log_totals(db, models.WorkoutLogExercise.workout_log_id.in_(log_ids))
+        await rollup_training_volume(db, models.WorkoutLogExercise.workout_log_id.in_(log_ids))
+        await rollup_personal_records(db, models.WorkoutLogExercise.workout_log_id.in_(log_ids))
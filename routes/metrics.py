@@ -0,0 +1,28 @@
+from fastapi import APIRouter,Depends
+
+from db.database import sessionmanger
+from oauth2 import get_current_user
+from utils.cache import cache
+from utils.intent import intent_sources
+from utils.jobs import job_queue
+from utils.llm import llm_limiter
+
+metrics_route = APIRouter(prefix='/metrics')
+
+
+@metrics_route.get('/cache')
+async def get_cache_metrics(current_user:dict = Depends(get_current_user)):
+    """Hit and miss counters for the in-process L1 and Redis tiers of this worker."""
+    return cache.stats()
+
+
+@metrics_route.get('/db')
+async def get_db_metrics(current_user:dict = Depends(get_current_user)):
+    """Connection pool saturation and checkout wait times for this worker."""
+    return sessionmanger.pool_status()
+
+
+@metrics_route.get('/genai')
+async def get_genai_metrics(current_user:dict = Depends(get_current_user)):
+    """Model call limiter occupancy, queue wait times and how intents were decided."""
+    return {**llm_limiter.stats(), "intent_sources": intent_sources, "jobs": job_queue.stats()}
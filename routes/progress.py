@@ -1,6 +1,8 @@
-import json
-from typing import List
-from fastapi import APIRouter,HTTPException,status,Depends
+from datetime import date
+from typing import Literal, Optional
+import orjson
+from fastapi import APIRouter,HTTPException,status,Depends,Query
+from redis.exceptions import RedisError
 from sqlalchemy import select
 from db.database import get_db
 from sqlalchemy.orm import Session
@@ -9,14 +11,16 @@ import models
 from oauth2 import get_current_user
 from utils.logger import setup_logger
 import schemas
-from utils.cache import cache
+from utils.cache import cache, cached
+from utils.pagination import paginate
+from utils.progress import LAST_BUCKET_FIELD, bucket_start, load_progress_buckets, progress_analytics_key, progress_analytics_keys, refresh_progress_analytics
+from config import Config
 
 progress_route = APIRouter(prefix='/progress')
 
 
 logger = setup_logger("progress_route")
 
-
 @progress_route.post('/',status_code=status.HTTP_201_CREATED, response_model=schemas.DisplayProgress)
 async def create_progress(progress_data: schemas.CreateProgress,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
@@ -30,7 +34,8 @@ async def create_progress(progress_data: schemas.CreateProgress,db:AsyncSession
         await db.commit()
         await db.refresh(new_progress)
         #clear cache for the user
-        cache.delete(cache_key)
+        await cache.delete(cache_key)
+        await refresh_progress_analytics(db, current_user.id, new_progress.date)
         logger.info("Progress created successfully")
         return new_progress
     except HTTPException as http_exec:
@@ -40,28 +45,27 @@ async def create_progress(progress_data: schemas.CreateProgress,db:AsyncSession
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 
-@progress_route.get('/',response_model=List[schemas.DisplayProgress])
-async def get_progress(db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+@progress_route.get('/',response_model=schemas.Page[schemas.DisplayProgress])
+@cached("progress_user_{current_user.id}", schemas.Page[schemas.DisplayProgress], field="{limit}:{cursor}", negative_ex=60)
+async def get_progress(
+    limit:int = Query(Config.PAGE_SIZE_DEFAULT, ge=1, le=Config.PAGE_SIZE_MAX),
+    cursor:Optional[str] = None,
+    db:AsyncSession = Depends(get_db),
+    current_user:dict = Depends(get_current_user)
+):
+    """Newest entries first, one page at a time; every page is cached under the user's key."""
     try:
         # result = db.query(models.Progress).filter(models.Progress.user_id == current_user.id).all()
-        cache_key = f"progress_user_{current_user.id}"
-        if cache.exists(cache_key):
-            logger.info("Fetching progress from cache")
-            progress = cache.get(cache_key)
-            return json.loads(progress)
-        result = (await db.scalars(select(models.Progress).where(models.Progress.user_id == current_user.id)
-        )).all()
-        if len(result) == 0:
+        result = await paginate(
+            db,
+            select(models.Progress).where(models.Progress.user_id == current_user.id),
+            (models.Progress.date, models.Progress.id),
+            cursor, limit, descending=True
+        )
+        if cursor is None and len(result["items"]) == 0:
             logger.warning(f"No progress found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No progress found in database")
         logger.info("Progress fetched successfully")
-        # Set the cache
-        pydantic_data = [schemas.DisplayProgress.model_validate(progress) for progress in result]
-        cache.set(
-            cache_key,
-            json.dumps([data.model_dump(mode='json') for data in pydantic_data]),
-            ex=3600  # Cache for 1 hour
-        )
         return result
     except HTTPException as http_exec:
         raise http_exec
@@ -70,26 +74,58 @@ async def get_progress(db:AsyncSession = Depends(get_db),current_user:dict = Dep
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 
+@progress_route.get('/analytics',response_model=schemas.ProgressAnalytics)
+async def get_progress_analytics(
+    bucket:Literal["day", "week", "month"] = "week",
+    start:Optional[date] = None,
+    end:Optional[date] = None,
+    db:AsyncSession = Depends(get_db),
+    current_user:dict = Depends(get_current_user)
+):
+    """
+    Average, min, max and moving average of every metric per day, week or month.
+
+    The aggregates are computed in Postgres, and the series is cached as one
+    hash per (user, bucket) with a field per bucket. Each request then reads
+    the `start`..`end` range from that hash. A new entry in the newest bucket
+    only recomputes that bucket (see `refresh_progress_analytics`).
+    """
+    try:
+        key = progress_analytics_key(current_user.id, bucket)
+        try:
+            cached = await cache.hgetall_raw(key)
+        except RedisError as e:
+            logger.warning(f"Cache read failed for '{key}': {e}")
+            cached = {}
+        if LAST_BUCKET_FIELD.encode() in cached:
+            rows = [orjson.loads(value) for field, value in cached.items() if field != LAST_BUCKET_FIELD.encode()]
+        else:
+            series = await load_progress_buckets(db, current_user.id, bucket)
+            mapping = {row["bucket_start"].isoformat(): orjson.dumps(row) for row in series}
+            mapping[LAST_BUCKET_FIELD] = series[-1]["bucket_start"].isoformat() if series else ""
+            await cache.hset_many(key, mapping, ex=Config.PROGRESS_ANALYTICS_TTL, replace=True)
+            rows = [orjson.loads(value) for field, value in mapping.items() if field != LAST_BUCKET_FIELD]
+
+        lower = bucket_start(start, bucket).isoformat() if start else ""
+        upper = end.isoformat() if end else "9999-12-31"
+        rows = sorted((row for row in rows if lower <= row["bucket_start"] <= upper), key=lambda row: row["bucket_start"])
+        return {"bucket": bucket, "moving_average_buckets": Config.PROGRESS_MOVING_AVERAGE_BUCKETS, "buckets": rows}
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @progress_route.get('/{progress_id}',response_model=schemas.DisplayProgress)
-def get_progress_by_id(progress_id:int,db:Session = Depends(get_db),current_user:dict = Depends(get_current_user)):
+@cached("progress_{progress_id}", schemas.DisplayProgress, negative_ex=60)
+async def get_progress_by_id(progress_id:int,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
-        cache_key = f"progress_{progress_id}"
-        if cache.exists(cache_key):
-            logger.info("Fetching progress from cache")
-            progress = cache.get(cache_key)
-            return json.loads(progress)
-        progress = db.query(models.Progress).filter(models.Progress.id == progress_id).first()
+        progress = (await db.scalars(select(models.Progress).where(models.Progress.id == progress_id))).first()
         if progress is None:
             logger.warning(f"No progress with id {progress_id} found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Progress with id {progress_id} not found")
         logger.info("Progress fetched successfully")
-        pydantic_data = schemas.DisplayProgress.model_validate(progress)
-        # Set the cache
-        cache.set(
-            cache_key,
-            json.dumps(pydantic_data.model_dump(mode='json')),
-            ex=3600  # Cache for 1 hour
-        )
         return progress
     except HTTPException as http_exec:
         raise http_exec
@@ -99,24 +135,24 @@ def get_progress_by_id(progress_id:int,db:Session = Depends(get_db),current_user
     
 
 @progress_route.put('/{progress_id}',response_model=schemas.DisplayProgress)
-def update_progress(progress_id:int,progress_data:schemas.UpdateProgress,db:Session = Depends(get_db),current_user:dict = Depends(get_current_user)):
+async def update_progress(progress_id:int,progress_data:schemas.UpdateProgress,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
-        progress = db.query(models.Progress).filter(models.Progress.id == progress_id).first()
+        progress = (await db.scalars(select(models.Progress).where(models.Progress.id == progress_id))).first()
         if progress is None:
             logger.warning(f"No progress with id {progress_id} found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Progress with id {progress_id} not found")
         for key,value in progress_data.model_dump().items():
             setattr(progress,key,value)
-        db.commit()
-        db.refresh(progress)
+        await db.commit()
+        await db.refresh(progress)
         logger.info("Progress updated successfully")
-        # Update the cache
+        # Update the cache and drop the user's list in one round trip
         cache_key = f"progress_{progress_id}"
-        cache.set(
-            cache_key,
-            json.dumps(progress.model_dump(mode='json')),
-            ex=3600  # Cache for 1 hour
-        )
+        pydantic_data = schemas.DisplayProgress.model_validate(progress)
+        async with cache.pipeline() as pipe:
+            pipe.set(cache_key, pydantic_data.model_dump_json(), ex=3600)  # Cache for 1 hour
+            pipe.delete(f"progress_user_{current_user.id}", *progress_analytics_keys(current_user.id))
+            await pipe.execute()
         return progress
     except HTTPException as http_exec:
         raise http_exec
@@ -125,18 +161,18 @@ def update_progress(progress_id:int,progress_data:schemas.UpdateProgress,db:Sess
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @progress_route.delete('/{progress_id}',status_code=status.HTTP_204_NO_CONTENT)
-def delete_progress(progress_id:int,db:Session = Depends(get_db),current_user:dict = Depends(get_current_user)):
+async def delete_progress(progress_id:int,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
-        progress = db.query(models.Progress).filter(models.Progress.id == progress_id).first()
+        progress = (await db.scalars(select(models.Progress).where(models.Progress.id == progress_id))).first()
         if progress is None:
             logger.warning(f"No progress with id {progress_id} found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Progress with id {progress_id} not found")
-        db.delete(progress)
-        db.commit()
+        await db.delete(progress)
+        await db.commit()
         logger.info("Progress deleted successfully")
         # Delete the cache
         cache_key = f"progress_{progress_id}"
-        cache.delete(cache_key)
+        await cache.delete(cache_key, f"progress_user_{current_user.id}", *progress_analytics_keys(current_user.id))
     except HTTPException as http_exec:
         raise http_exec
     except Exception as e:
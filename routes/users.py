@@ -1,5 +1,4 @@
-import json
-from fastapi import APIRouter, status, Depends,HTTPException, Form
+from fastapi import APIRouter, status, Depends,HTTPException, Form, Response
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
@@ -44,10 +43,10 @@ async def get_user(user_id:str,db:AsyncSession = Depends(get_db),current_user:di
         if user_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,detail="User does not have permission to update this profile")
         cache_key = f"user_{user_id}"
-        if cache.exists(cache_key):
+        cached = await cache.get_raw(cache_key)
+        if cached is not None:
             logger.info("Fetching user from cache")
-            user = cache.get(cache_key)
-            return json.loads(user)
+            return Response(content=cached, media_type="application/json")
         user_profile = (await db.scalars(select(models.UserProfile).where(models.UserProfile.user_id == user_id)
                               )).first() 
         if user_profile is None:
@@ -57,9 +56,9 @@ async def get_user(user_id:str,db:AsyncSession = Depends(get_db),current_user:di
 
         pydantic_data = schemas.DisplayUserProfile.model_validate(user_profile)
 
-        cache.set(
+        await cache.set(
             cache_key,
-            json.dumps(pydantic_data.model_dump(mode='json'))
+            pydantic_data.model_dump_json()
         )
 
         return user_profile
@@ -139,8 +138,7 @@ async def update_profile(user_id:str,profile_data:schemas.UpdateUserProfile,db:A
         await db.refresh(profile)
         logger.info("User profile updated successfully")
         cache_key = f"user_{user_id}"
-        if cache.exists(cache_key):
-            cache.delete(cache_key)
+        await cache.delete(cache_key)
         return profile
     except HTTPException as http_exec:
         raise http_exec
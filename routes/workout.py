@@ -1,4 +1,3 @@
-import json
 from typing import List
 from fastapi import APIRouter,HTTPException,status,Depends
 from db.database import get_db
@@ -10,35 +9,42 @@ import models
 from oauth2 import get_current_user
 from utils.logger import setup_logger
 import schemas
-from utils.cache import cache
+from utils.cache import cache, cached
+from utils.records import personal_records_key, rebuild_personal_records
+from utils.volume import rollup_training_volume, training_volume_key, workout_summary_key
 
 workout_route = APIRouter(prefix='/workouts')
 logger = setup_logger("workout_route")
 
+
+def plan_tree_key(user_id, plan_id) -> str:
+    return f"user:{user_id}:workout_plan_tree:{plan_id}"
+
+
+def plan_cache_keys(user_id, plan_id) -> List[str]:
+    """Cached documents that embed the structure of a plan."""
+    return [f"user:{user_id}:workout_plan:{plan_id}", plan_tree_key(user_id, plan_id)]
+
+
+async def get_user_day(db:AsyncSession, day_id:int, user_id):
+    """The day and the id of its plan, or (None, None) if the day isn't in one of the user's plans."""
+    row = (await db.execute(select(models.WorkoutPlanDay, models.WorkoutPlanWeek.workout_plan_id).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).where(
+        models.WorkoutPlanDay.id == day_id,
+        models.WorkoutPlan.user_id == user_id
+    ))).first()
+    return tuple(row) if row else (None, None)
+
+
 @workout_route.get('/',response_model=List[schemas.DisplayWorkoutPlan])
+@cached("user:{current_user.id}:workouts", List[schemas.DisplayWorkoutPlan], negative_ex=60)
 async def get_workouts(db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
         # result = db.query(models.WorkoutPlan).all()
-        cache_key  = f"user:{current_user.id}:workouts"
-        if cache.exists(cache_key):
-            logger.info("Fetching workout plans from cache")
-            result = cache.get(f"user:{current_user.id}:workouts")
-            print(type(result))
-            return json.loads(result)
         result  = (await db.scalars(select(models.WorkoutPlan).where(models.WorkoutPlan.user_id == current_user.id))).all()
         if len(result) == 0:
             logger.warning(f"No workout plan found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No workout plan found in database")
         logger.info("Workout plans fetched successfully")
-        # Convert to Pydantic models
-        pydantic_data = [schemas.DisplayWorkoutPlan.model_validate(item) for item in result]
-
-        # Cache the result
-        cache.set(
-            cache_key,
-            json.dumps([item.model_dump(mode='json') for item in pydantic_data]),
-            ex=3600
-        )  # Cache for 1 hour
         return result
     except HTTPException as http_exec:
         raise http_exec
@@ -47,6 +53,7 @@ async def get_workouts(db:AsyncSession = Depends(get_db),current_user:dict = Dep
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @workout_route.get("/{plan_id}")
+@cached("user:{current_user.id}:workout_plan:{plan_id}", List[schemas.DisplayWorkoutPlanResponse], negative_ex=60, local=True)
 async def get_workout_plan(
     plan_id: int, 
     db: AsyncSession = Depends(get_db), 
@@ -55,11 +62,6 @@ async def get_workout_plan(
     # plan = db.query(models.WorkoutPlan).filter(
     #     models.WorkoutPlan.id == plan_id, models.WorkoutPlan.user_id == current_user.id
     # ).first()
-    cache_key = f"user:{current_user.id}:workout_plan:{plan_id}"
-    if cache.exists(cache_key):
-        logger.info("Fetching workout plan from cache")
-        plan = cache.get(cache_key)
-        return json.loads(plan)
     plan = (await db.scalars(select(models.WorkoutPlan).where(models.WorkoutPlan.id == plan_id,models.WorkoutPlan.user_id == current_user.id)
                             .options(
                                 # Eagerly load 'weeks_schedule' relationship
@@ -80,18 +82,39 @@ async def get_workout_plan(
     # - plan.id, plan.name, plan.description, plan.weeks (the integer)
     # - plan.weeks_schedule (a list of WorkoutPlanWeek objects)
     #   - Each week_obj in plan.weeks_schedule has week_obj.days_schedule (a list of WorkoutPlanDay objects)
-    
-    pydantic_plan = [schemas.DisplayWorkoutPlanResponse.model_validate(item) for item in plan]
-    #Set the cache
-    cache.set(
-        cache_key,
-        json.dumps([item.model_dump(mode='json') for item in pydantic_plan]),
-        ex=3600  # Cache for 1 hour
-    )
 
     return plan # FastAPI will use WorkoutPlanResponse to serialize this
 
+
+@workout_route.get("/{plan_id}/tree", response_model=schemas.DisplayWorkoutPlanTree)
+@cached("user:{current_user.id}:workout_plan_tree:{plan_id}", schemas.DisplayWorkoutPlanTree, negative_ex=60, local=True)
+async def get_workout_plan_tree(
+    plan_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    The whole plan (weeks -> days -> exercises -> exercise details) in one response.
+
+    Each level is one SELECT ... IN query, so the number of queries doesn't grow
+    with the size of the plan. The serialized tree is cached and dropped by
+    every route that changes the plan.
+    """
+    plan = (await db.scalars(select(models.WorkoutPlan).where(models.WorkoutPlan.id == plan_id,models.WorkoutPlan.user_id == current_user.id)
+                            .options(
+                                selectinload(models.WorkoutPlan.weeks_schedule)
+                                .selectinload(models.WorkoutPlanWeek.days_schedule)
+                                .selectinload(models.WorkoutPlanDay.exercises)
+                                .selectinload(models.WorkoutPlanExercise.exercise)
+                            )
+                             )).first()
+
+    if not plan:
+        raise HTTPException(status_code=404, detail="Workout plan not found.")
+    return plan
+
 @workout_route.get("/days/{day_id}/exercises", response_model=List[schemas.DisplayWorkoutPlanExercise])
+@cached("user:{current_user.id}:workout_day_exercises:{day_id}", List[schemas.DisplayWorkoutPlanExercise], negative_ex=60)
 async def get_exercises_in_day(
     day_id: int, 
     db: AsyncSession = Depends(get_db), 
@@ -101,11 +124,6 @@ async def get_exercises_in_day(
     #     models.WorkoutPlanDay.id == day_id, 
     #     models.WorkoutPlan.user_id == current_user.id
     # ).first()
-    cache_key = f"user:{current_user.id}:workout_day_exercises:{day_id}"
-    if cache.exists(cache_key):
-        logger.info("Fetching exercises for day from cache")
-        exercises = cache.get(cache_key)
-        return json.loads(exercises)
     day = (await db.scalars(select(models.WorkoutPlanDay).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).where(
         models.WorkoutPlanDay.id == day_id,
         models.WorkoutPlan.user_id == current_user.id
@@ -119,14 +137,6 @@ async def get_exercises_in_day(
     # exercises = db.query(models.WorkoutPlanExercise).filter(models.WorkoutPlanExercise.workout_plan_day_id == day_id).all()
     exercises = (await db.scalars(select(models.WorkoutPlanExercise).where(models.WorkoutPlanExercise.workout_plan_day_id == day_id))).all()
 
-    #cache the result
-    pydantic_exercises = [schemas.DisplayWorkoutPlanExercise.model_validate(item) for item in exercises]
-    cache.set(
-        cache_key,
-        json.dumps([item.model_dump(mode='json') for item in pydantic_exercises]),
-        ex=3600  # Cache for 1 hour
-    )
-
     return exercises
 
 
@@ -134,9 +144,8 @@ async def get_exercises_in_day(
 async def create_workout(workout_data: schemas.CreateWorkoutPlan,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
         cache_key = f"user:{current_user.id}:workouts"
-        if cache.exists(cache_key):
-            logger.info("clearing cache for workout plans")
-            cache.delete(cache_key)
+        logger.info("clearing cache for workout plans")
+        await cache.delete(cache_key)
 
         new_workout = models.WorkoutPlan(user_id=current_user.id,**workout_data.model_dump())
         db.add(new_workout)
@@ -183,6 +192,7 @@ async def add_week_to_plan(
         db.add(week)
         await db.commit()
         await db.refresh(week)
+        await cache.delete(*plan_cache_keys(current_user.id, plan_id))
         return week
 
     except Exception as e:
@@ -203,7 +213,7 @@ async def add_day_to_week(
     week = (await db.scalars(select(models.WorkoutPlanWeek).join(models.WorkoutPlan).where(
         models.WorkoutPlanWeek.id == week_id, 
         models.WorkoutPlan.user_id == current_user.id
-    )))
+    ))).first()
 
     if not week:
         raise HTTPException(status_code=404, detail="Week not found or unauthorized access.")
@@ -222,9 +232,11 @@ async def add_day_to_week(
             workout_plan_week_id=week_id,
             day_of_week=day_data.day_of_week
         )
+        plan_id = week.workout_plan_id
         db.add(day)
         await db.commit()
         await db.refresh(day)
+        await cache.delete(*plan_cache_keys(current_user.id, plan_id))
         return day
 
     except Exception as e:
@@ -238,10 +250,7 @@ async def add_exercise_to_day(
     db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
-    day = (await db.scalars(select(models.WorkoutPlanDay).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).where(
-        models.WorkoutPlanDay.id == day_id, 
-        models.WorkoutPlan.user_id == current_user.id
-    ))).first()
+    day, plan_id = await get_user_day(db, day_id, current_user.id)
 
     if not day:
         raise HTTPException(status_code=404, detail="Day not found or unauthorized access.")
@@ -262,6 +271,7 @@ async def add_exercise_to_day(
         db.add(exercise_entry)
         await db.commit()
         await db.refresh(exercise_entry)
+        await cache.delete(f"user:{current_user.id}:workout_day_exercises:{day_id}", plan_tree_key(current_user.id, plan_id))
         return exercise_entry
 
     except Exception as e:
@@ -270,15 +280,15 @@ async def add_exercise_to_day(
 
 
 @workout_route.put("/{plan_id}", response_model=schemas.DisplayWorkoutPlan)
-def update_workout_plan(
+async def update_workout_plan(
     plan_id: int, 
     update_data: schemas.UpdateWorkoutPlan, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
-    plan = db.query(models.WorkoutPlan).filter(
+    plan = (await db.scalars(select(models.WorkoutPlan).where(
         models.WorkoutPlan.id == plan_id, models.WorkoutPlan.user_id == current_user.id
-    ).first()
+    ))).first()
 
     if not plan:
         raise HTTPException(status_code=404, detail="Workout plan not found.")
@@ -287,51 +297,48 @@ def update_workout_plan(
     for key, value in update_data.model_dump(exclude_unset=True).items():
         setattr(plan, key, value)
 
-    db.commit()
-    db.refresh(plan)
+    await db.commit()
+    await db.refresh(plan)
     logger.info("Workout plan updated successfully")
-    # Clear the cache for this plan
-    cache_key = f"user:{current_user.id}:workout_plan:{plan_id}"
-    cache.delete(cache_key)
+    # Clear the cache for this plan and the plan list in one round trip
+    workout_list_cache_key = f"user:{current_user.id}:workouts"
+    await cache.delete(*plan_cache_keys(current_user.id, plan_id), workout_list_cache_key)
     return plan
 
 
 @workout_route.put("/days/{day_id}/exercises", response_model=List[schemas.DisplayWorkoutPlanExercise])
-def update_exercises_in_day(
+async def update_exercises_in_day(
     day_id: int, 
     exercises: List[schemas.UpdateExerciseInWorkout], 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
-    day = db.query(models.WorkoutPlanDay).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).filter(
-        models.WorkoutPlanDay.id == day_id, models.WorkoutPlan.user_id == current_user.id
-    ).first()
+    day, plan_id = await get_user_day(db, day_id, current_user.id)
 
     if not day:
         raise HTTPException(status_code=404, detail="Day not found.")
 
     updated_exercises = []
     for exercise in exercises:
-        workout_exercise = db.query(models.WorkoutPlanExercise).filter(
+        workout_exercise = (await db.scalars(select(models.WorkoutPlanExercise).where(
             models.WorkoutPlanExercise.workout_plan_day_id == day_id,
             models.WorkoutPlanExercise.exercise_id == exercise.exercise_id
-        ).first()
+        ))).first()
 
         if not workout_exercise:
             raise HTTPException(status_code=404, detail=f"Exercise {exercise.exercise_id} not found in this day.")
 
         # Only update provided fields
-        for key,value in updated_exercises.model_dump(exclude_unset=True).items():
+        for key,value in exercise.model_dump(exclude_unset=True).items():
             setattr(workout_exercise, key, value)
 
         updated_exercises.append(workout_exercise)
 
-    db.commit() 
-    db.refresh(updated_exercises)
+    await db.commit() 
     logger.info("Exercises updated successfully")
-    # Clear the cache for this day's exercises
+    # Clear the cache for this day's exercises and the plan tree
     cache_key = f"user:{current_user.id}:workout_day_exercises:{day_id}"
-    cache.delete(cache_key)
+    await cache.delete(cache_key, plan_tree_key(current_user.id, plan_id))
     return updated_exercises
 
 
@@ -351,14 +358,24 @@ async def delete_workout_plan(plan_id: int, db: AsyncSession = Depends(get_db),
         if not plan:
             raise HTTPException(status_code=404, detail="Workout plan not found.")
 
+        # The plan's logs go with it, so take their volume out of the rollup first
+        await rollup_training_volume(db, models.WorkoutLog.workout_plan_id == plan_id, sign=-1)
         await db.delete(plan)
+        await db.flush()
+        # Records are high-water marks and can't be taken back incrementally
+        await rebuild_personal_records(db, current_user.id)
         await db.commit()
         logger.info("Workout plan deleted successfully")
         # Clear the cache for this plan
-        plan_cache_key = f"user:{current_user.id}:workout_plan:{plan_id}"
         wokrout_list_cache_key = f"user:{current_user.id}:workouts"
-        cache.delete(plan_cache_key)
-        cache.delete(wokrout_list_cache_key)
+        await cache.delete(
+            *plan_cache_keys(current_user.id, plan_id),
+            wokrout_list_cache_key,
+            f"workout_logs_user_{current_user.id}",
+            training_volume_key(current_user.id),
+            workout_summary_key(current_user.id),
+            personal_records_key(current_user.id)
+        )
     except HTTPException as http_exec:
         raise http_exec
     except Exception as e:
@@ -366,24 +383,24 @@ async def delete_workout_plan(plan_id: int, db: AsyncSession = Depends(get_db),
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @workout_route.delete("/days/{day_id}/exercises/{exercise_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_exercise_from_day(
+async def delete_exercise_from_day(
     day_id: int, 
     exercise_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
-    exercise = db.query(models.WorkoutPlanExercise).join(models.WorkoutPlanDay).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).filter(
+    exercise, plan_id = (await db.execute(select(models.WorkoutPlanExercise, models.WorkoutPlanWeek.workout_plan_id).join(models.WorkoutPlanDay).join(models.WorkoutPlanWeek).join(models.WorkoutPlan).where(
         models.WorkoutPlanExercise.workout_plan_day_id == day_id, 
         models.WorkoutPlanExercise.exercise_id == exercise_id, 
         models.WorkoutPlan.user_id == current_user.id
-    ).first()
+    ))).first() or (None, None)
 
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found.")
 
-    db.delete(exercise)
-    db.commit()
+    await db.delete(exercise)
+    await db.commit()
     logger.info("Exercise deleted successfully")
-    # Clear the cache for this day's exercises
+    # Clear the cache for this day's exercises and the plan tree
     cache_key = f"user:{current_user.id}:workout_day_exercises:{day_id}"
-    cache.delete(cache_key)
+    await cache.delete(cache_key, plan_tree_key(current_user.id, plan_id))
@@ -1,7 +1,7 @@
-import json
-from typing import List
-from fastapi import APIRouter,HTTPException,status,Depends
-from sqlalchemy import select
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter,HTTPException,status,Depends,Query
+from sqlalchemy import Date, cast, func, insert, select
 from db.database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
@@ -9,7 +9,11 @@ import models
 from oauth2 import get_current_user
 from utils.logger import setup_logger
 import schemas
-from utils.cache import cache
+from utils.cache import cache, cached
+from utils.pagination import paginate
+from utils.volume import refresh_workout_log_totals, rollup_training_volume, training_volume_key, workout_summary_key
+from utils.records import personal_records_key, update_personal_records
+from config import Config
 
 workout_log_route = APIRouter(prefix='/workout_logs')
 logger = setup_logger("workout_logs_route")
@@ -28,9 +32,8 @@ async def create_workout_log(workout_log_data: schemas.CreateWorkoutLog,db:Async
         await db.refresh(new_workout_log)
         logger.info("Workout log created successfully")
         cache_key = f"workout_logs_user_{current_user.id}"
-        if cache.exists(cache_key):
-            logger.info("Invalidating cache for workout logs")
-            cache.delete(cache_key)
+        logger.info("Invalidating cache for workout logs")
+        await cache.delete(cache_key, workout_summary_key(current_user.id))
         return new_workout_log
     except HTTPException as http_exec:
         raise http_exec
@@ -38,8 +41,75 @@ async def create_workout_log(workout_log_data: schemas.CreateWorkoutLog,db:Async
         logger.error(str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@workout_log_route.post('/{workout_log_id}/exercises',response_model=List[schemas.DisplayWorkoutLogExercise],status_code=status.HTTP_201_CREATED)
+@workout_log_route.post('/sessions',status_code=status.HTTP_201_CREATED,response_model=schemas.DisplayLoggedWorkoutSession)
+async def create_workout_session(session_data: schemas.CreateWorkoutSession,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+    """
+    Log a workout and all of its exercises in one request.
+
+    The log and its exercises are written in one transaction, each with a
+    single INSERT ... RETURNING, so the response is built from the inserted
+    rows without reading them back. The log's calorie and active time totals,
+    the weekly volume rollup and the personal records are updated in the same
+    transaction, and every exercise lists the records it set.
+    """
+    try:
+        workout_plan_id = await db.scalar(select(models.WorkoutPlan.id).where(
+            models.WorkoutPlan.id == session_data.workout_plan_id,
+            models.WorkoutPlan.user_id == current_user.id
+        ))
+        if workout_plan_id is None:
+            logger.warning(f"No workout plan with id {session_data.workout_plan_id} found in database")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail= f"No workout plan with id {session_data.workout_plan_id} found in database")
+
+        workout_log = await db.scalar(
+            insert(models.WorkoutLog)
+            .values(user_id=current_user.id,**session_data.model_dump(exclude={"exercises"}))
+            .returning(models.WorkoutLog)
+        )
+        exercises, new_records, totals = [], {}, {}
+        if session_data.exercises:
+            exercises = (await db.scalars(
+                insert(models.WorkoutLogExercise).returning(models.WorkoutLogExercise, sort_by_parameter_order=True),
+                [{"workout_log_id": workout_log.id, **exercise.model_dump()} for exercise in session_data.exercises]
+            )).all()
+            totals = await refresh_workout_log_totals(db, models.WorkoutLogExercise.workout_log_id == workout_log.id)
+            await rollup_training_volume(db, models.WorkoutLogExercise.workout_log_id == workout_log.id)
+            new_records = await update_personal_records(db, current_user.id, exercises)
+        await db.commit()
+        logger.info(f"Workout session {workout_log.id} logged with {len(exercises)} exercises")
+        await cache.delete(
+            f"workout_logs_user_{current_user.id}",
+            f"workout_log_exercises_{workout_log.id}",
+            training_volume_key(current_user.id),
+            workout_summary_key(current_user.id),
+            *([personal_records_key(current_user.id)] if new_records else [])
+        )
+        return schemas.DisplayLoggedWorkoutSession(
+            **schemas.DisplayWorkoutLog.model_validate(workout_log).model_dump() | totals.get(workout_log.id, {}),
+            exercises=[
+                schemas.DisplayLoggedWorkoutLogExercise(
+                    **schemas.DisplayWorkoutLogExercise.model_validate(exercise).model_dump(),
+                    new_records=new_records.get(exercise.id, [])
+                )
+                for exercise in exercises
+            ]
+        )
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        await db.rollback()
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@workout_log_route.post('/{workout_log_id}/exercises',response_model=List[schemas.DisplayLoggedWorkoutLogExercise],status_code=status.HTTP_201_CREATED)
 async def add_exercise_to_workout_log(workout_log_id:int,exercise_data: List[schemas.AddExerciseToWorkoutLog],db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+    """
+    Add exercises to a workout log and return all of the log's exercises.
+
+    The log's calorie and active time totals and the user's personal records
+    are updated on the way in; the new exercises list the records they set
+    under `new_records`.
+    """
     try:
         workout_log = (await db.scalars(select(models.WorkoutLog).where(models.WorkoutLog.id == workout_log_id))).first()
         if workout_log is None:
@@ -54,6 +124,10 @@ async def add_exercise_to_workout_log(workout_log_id:int,exercise_data: List[sch
             )
             new_workout_log_exercises.append(new_workout_log_exercise)
         db.add_all(new_workout_log_exercises)
+        await db.flush()
+        await refresh_workout_log_totals(db, models.WorkoutLogExercise.workout_log_id == workout_log_id)
+        await rollup_training_volume(db, models.WorkoutLogExercise.id.in_([exercise.id for exercise in new_workout_log_exercises]))
+        new_records = await update_personal_records(db, workout_log.user_id, new_workout_log_exercises)
         await db.commit()
         result = (await db.scalars(
             select(models.WorkoutLogExercise).where(
@@ -62,37 +136,155 @@ async def add_exercise_to_workout_log(workout_log_id:int,exercise_data: List[sch
         )).all()
         logger.info("Workout log exercise created successfully")
         cache_key = f"workout_log_exercises_{workout_log_id}"
-        if cache.exists(cache_key):
-            logger.info("Invalidating cache for workout log exercises")
-            cache.delete(cache_key)
-        return result
+        logger.info("Invalidating cache for workout log exercises")
+        await cache.delete(
+            cache_key,
+            f"workout_logs_user_{workout_log.user_id}",
+            training_volume_key(workout_log.user_id),
+            workout_summary_key(workout_log.user_id),
+            *([personal_records_key(workout_log.user_id)] if new_records else [])
+        )
+        return [
+            schemas.DisplayLoggedWorkoutLogExercise(
+                **schemas.DisplayWorkoutLogExercise.model_validate(exercise).model_dump(),
+                new_records=new_records.get(exercise.id, [])
+            )
+            for exercise in result
+        ]
     except HTTPException as http_exec:
         raise http_exec
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@workout_log_route.get('/',response_model=List[schemas.DisplayWorkoutLog])
-async def get_workout_logs(db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+@workout_log_route.get('/',response_model=schemas.Page[schemas.DisplayWorkoutLog])
+@cached("workout_logs_user_{current_user.id}", schemas.Page[schemas.DisplayWorkoutLog], field="{limit}:{cursor}", negative_ex=60)
+async def get_workout_logs(
+    limit:int = Query(Config.PAGE_SIZE_DEFAULT, ge=1, le=Config.PAGE_SIZE_MAX),
+    cursor:Optional[str] = None,
+    db:AsyncSession = Depends(get_db),
+    current_user:dict = Depends(get_current_user)
+):
+    """Newest logs first, one page at a time; every page is cached under the user's key."""
     try:
-        cache_key = f"workout_logs_user_{current_user.id}"
-        if cache.exists(cache_key):
-            logger.info("Fetching workout logs from cache")
-            workout_logs = cache.get(cache_key)
-            return json.loads(workout_logs)
-        result = (await db.scalars(select(models.WorkoutLog).where(models.WorkoutLog.user_id == current_user.id))).all()
-        if len(result) == 0:
+        result = await paginate(
+            db,
+            # date is the keyset's leading column, so logs without one can't be paged
+            select(models.WorkoutLog).where(models.WorkoutLog.user_id == current_user.id, models.WorkoutLog.date.is_not(None)),
+            (models.WorkoutLog.date, models.WorkoutLog.id),
+            cursor, limit, descending=True
+        )
+        if cursor is None and len(result["items"]) == 0:
             logger.warning(f"No workout log found in database")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No workout log found in database")
         logger.info("Workout logs fetched successfully")
-        # Set the cache
-        pydantic_data = [schemas.DisplayWorkoutLog.model_validate(workout_log) for workout_log in result]
+        return result
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-        cache.set(
-            cache_key,
-            json.dumps([data.model_dump(mode='json') for data in pydantic_data]),
-            ex=3600  # Cache for 1 hour
+@workout_log_route.get('/summary',response_model=List[schemas.WorkoutSummary])
+@cached("workout_summary_{current_user.id}", List[schemas.WorkoutSummary], field="{period}:{start}:{end}")
+async def get_workout_summary(
+    period:Literal["week", "month"] = "week",
+    start:Optional[date] = None,
+    end:Optional[date] = None,
+    db:AsyncSession = Depends(get_db),
+    current_user:dict = Depends(get_current_user)
+):
+    """
+    Workouts, duration and estimated calories per week or month, oldest
+    first. Only the totals stored on each log are summed, so no
+    exercise rows are read. `start` and `end` bound the log dates, both
+    inclusive.
+    """
+    try:
+        log = models.WorkoutLog
+        period_start = cast(func.date_trunc(period, log.date), Date)
+        query = (
+            select(
+                period_start.label("period_start"),
+                func.count().label("workouts"),
+                func.coalesce(func.sum(log.duration), 0).label("duration"),
+                func.sum(log.estimated_calories).label("estimated_calories"),
+            )
+            .where(log.user_id == current_user.id, log.date.is_not(None))
+            .group_by(period_start)
+            .order_by(period_start)
         )
+        if start is not None:
+            query = query.where(log.date >= start)
+        if end is not None:
+            query = query.where(cast(log.date, Date) <= end)
+        result = (await db.execute(query)).mappings().all()
+        logger.info("Workout summary fetched successfully")
+        return result
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@workout_log_route.get('/volume',response_model=List[schemas.DisplayTrainingVolume])
+@cached("training_volume_{current_user.id}", List[schemas.DisplayTrainingVolume], field="{start}:{end}:{muscle_group}")
+async def get_training_volume(
+    start:Optional[date] = None,
+    end:Optional[date] = None,
+    muscle_group:Optional[str] = None,
+    db:AsyncSession = Depends(get_db),
+    current_user:dict = Depends(get_current_user)
+):
+    """
+    Weekly sets, reps and tonnage per muscle group, read from the rollup
+    table instead of re-aggregating the logs. `start` and `end` bound the
+    week start dates, both inclusive.
+    """
+    try:
+        query = select(models.TrainingVolume).where(models.TrainingVolume.user_id == current_user.id)
+        if start is not None:
+            query = query.where(models.TrainingVolume.week_start >= start)
+        if end is not None:
+            query = query.where(models.TrainingVolume.week_start <= end)
+        if muscle_group is not None:
+            query = query.where(models.TrainingVolume.muscle_group == muscle_group)
+        result = (await db.scalars(query.order_by(models.TrainingVolume.week_start, models.TrainingVolume.muscle_group))).all()
+        logger.info("Training volume fetched successfully")
+        return result
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@workout_log_route.get('/records',response_model=List[schemas.DisplayPersonalRecord])
+@cached("personal_records_{current_user.id}", List[schemas.DisplayPersonalRecord], field="all")
+async def get_personal_records(db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+    """The user's best lifts for every exercise they have logged."""
+    try:
+        result = (await db.scalars(
+            select(models.PersonalRecord)
+            .where(models.PersonalRecord.user_id == current_user.id)
+            .order_by(models.PersonalRecord.exercise_id)
+        )).all()
+        logger.info("Personal records fetched successfully")
+        return result
+    except HTTPException as http_exec:
+        raise http_exec
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@workout_log_route.get('/records/{exercise_id}',response_model=schemas.DisplayPersonalRecord)
+@cached("personal_records_{current_user.id}", schemas.DisplayPersonalRecord, field="{exercise_id}", negative_ex=60)
+async def get_personal_record(exercise_id:int,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
+    """The user's best lifts for one exercise, a primary key lookup."""
+    try:
+        result = await db.get(models.PersonalRecord, (current_user.id, exercise_id))
+        if result is None:
+            logger.warning(f"No personal record for exercise {exercise_id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"No personal record for exercise {exercise_id}")
         return result
     except HTTPException as http_exec:
         raise http_exec
@@ -102,27 +294,16 @@ async def get_workout_logs(db:AsyncSession = Depends(get_db),current_user:dict =
 
 
 @workout_log_route.get('/{workout_log_id}/exercises')
+@cached("workout_log_exercises_{workout_log_id}", List[schemas.DisplayWorkoutLogExercise], negative_ex=60)
 async def get_workoutlog_exercises(workout_log_id:int,db:AsyncSession = Depends(get_db),current_user:dict = Depends(get_current_user)):
     try:
         # result = db.query(models.WorkoutLogExercise).filter(models.WorkoutLogExercise.workout_log_id == workout_log_id).all()
-        cache_key = f"workout_log_exercises_{workout_log_id}"
-        if cache.exists(cache_key):
-            logger.info("Fetching workout log exercises from cache")
-            exercises = cache.get(cache_key)
-            return json.loads(exercises)
         result = (await db.scalars(select(models.WorkoutLogExercise).where(models.WorkoutLogExercise.workout_log_id == workout_log_id))).all()
         if len(result) == 0:
             logger.warning("No exercises logged for this workout")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="No exercises logged for this workout")
         logger.info("Exercise logs fetched successfully!!!")
-        # Set the cache
-        pydantic_data = [schemas.DisplayWorkoutLogExercise.model_validate(exercise) for exercise in result]
-        cache.set(
-            cache_key,
-            json.dumps([data.model_dump(mode='json') for data in pydantic_data]),
-            ex=3600  # Cache for 1 hour
-        )
-        return pydantic_data
+        return result
     except HTTPException as http_exec:
         raise http_exec
     except Exception as e:
@@ -1,6 +1,13 @@
 from pydantic import  BaseModel, EmailStr, UUID4
 from datetime import date,datetime
-from typing import List, Optional
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """One page of a list endpoint; pass `next_cursor` back as `cursor` for the next one"""
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 class UserBase(BaseModel):
     username:str
@@ -56,6 +63,12 @@ class TokenData(BaseModel):
     token:str
     type:str
 
+class CurrentUser(BaseModel):
+    """Authenticated caller, built from verified Supabase token claims"""
+    id:str
+    email:Optional[str]=None
+    role:Optional[str]=None
+
 
 #------------------------------Exercise Schema--------------------------------
 
@@ -180,6 +193,22 @@ class DisplayWorkoutPlanResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class DisplayWorkoutPlanExerciseDetail(DisplayWorkoutPlanExercise):
+    """Schema for a plan exercise with its exercise details"""
+    exercise: DisplayExercise
+
+class DisplayWorkoutPlanDayTree(DisplayWorkoutPlanDay):
+    """Schema for a workout plan day with its exercises"""
+    exercises: List[DisplayWorkoutPlanExerciseDetail] = []
+
+class DisplayWorkoutPlanWeekTree(DisplayWorkoutPlanWeek):
+    """Schema for a workout plan week with its days and exercises"""
+    days_schedule: List[DisplayWorkoutPlanDayTree] = []
+
+class DisplayWorkoutPlanTree(DisplayWorkoutPlanResponse):
+    """Schema for a whole workout plan: weeks, days, exercises and exercise details"""
+    weeks_schedule: List[DisplayWorkoutPlanWeekTree] = []
     
 
 
@@ -194,6 +223,7 @@ class DisplayWorkoutLog(CreateWorkoutLog):
     date:datetime
     id:int
     user_id:UUID4
+    estimated_calories:float=0
     
     class Config:
         from_attributes = True
@@ -212,6 +242,73 @@ class DisplayWorkoutLogExercise(AddExerciseToWorkoutLog):
     class Config:
         from_attributes = True
 
+class CreateWorkoutSession(CreateWorkoutLog):
+    """A workout log together with every exercise performed in it"""
+    exercises:List[AddExerciseToWorkoutLog] = []
+
+class DisplayWorkoutSession(DisplayWorkoutLog):
+    exercises:List[DisplayWorkoutLogExercise] = []
+
+class NewRecord(BaseModel):
+    """A personal record set by a logged exercise; record is max_weight, max_weight_reps (more reps at the max weight), max_reps or estimated_one_rep_max"""
+    record:str
+    value:float
+    previous:Optional[float]=None
+
+class DisplayLoggedWorkoutLogExercise(DisplayWorkoutLogExercise):
+    new_records:List[NewRecord] = []
+
+class DisplayLoggedWorkoutSession(DisplayWorkoutSession):
+    exercises:List[DisplayLoggedWorkoutLogExercise] = []
+
+class DisplayPersonalRecord(BaseModel):
+    exercise_id:int
+    max_weight:Optional[float]=None
+    max_weight_reps:Optional[int]=None
+    max_reps:Optional[int]=None
+    estimated_one_rep_max:Optional[float]=None
+    updated_at:datetime
+
+    class Config:
+        from_attributes = True
+
+class ImportWorkoutLog(CreateWorkoutSession):
+    """A past workout session brought in by a history import"""
+    date:datetime
+
+class WorkoutSummary(BaseModel):
+    """Totals of the workout logs in the week or month starting period_start; duration stands in for active time"""
+    period_start:date
+    workouts:int
+    duration:int
+    estimated_calories:float
+
+class DisplayTrainingVolume(BaseModel):
+    """Sets, reps and tonnage logged for one muscle group in the week starting week_start"""
+    week_start:date
+    muscle_group:str
+    sets:int
+    reps:int
+    tonnage:float
+
+    class Config:
+        from_attributes = True
+
+
+#------------------------------History import Schema--------------------------------
+
+class ImportRowError(BaseModel):
+    line:int
+    error:str
+
+class ImportReport(BaseModel):
+    kind:str
+    imported:int
+    rejected:int
+    errors:List[ImportRowError] = []
+    seconds:float
+    rows_per_second:float
+
 
 #------------------------------User Progress Schema--------------------------------
 
@@ -230,6 +327,32 @@ class DisplayProgress(CreateProgress):
     class Config:
         from_attributes = True
 
+class ProgressBucket(BaseModel):
+    """Aggregates of the progress entries in one day, week or month"""
+    bucket_start:date
+    entries:int
+    weight_avg:Optional[float]=None
+    weight_min:Optional[float]=None
+    weight_max:Optional[float]=None
+    weight_moving_avg:Optional[float]=None
+    bmi_avg:Optional[float]=None
+    bmi_min:Optional[float]=None
+    bmi_max:Optional[float]=None
+    bmi_moving_avg:Optional[float]=None
+    body_fat_percentage_avg:Optional[float]=None
+    body_fat_percentage_min:Optional[float]=None
+    body_fat_percentage_max:Optional[float]=None
+    body_fat_percentage_moving_avg:Optional[float]=None
+    muscle_mass_avg:Optional[float]=None
+    muscle_mass_min:Optional[float]=None
+    muscle_mass_max:Optional[float]=None
+    muscle_mass_moving_avg:Optional[float]=None
+
+class ProgressAnalytics(BaseModel):
+    bucket:str
+    moving_average_buckets:int
+    buckets:List[ProgressBucket]
+
 class UpdateProgress(BaseModel):
     date:datetime
     weight:Optional[float]=None
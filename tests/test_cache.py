@@ -0,0 +1,88 @@
+import asyncio
+
+import fakeredis
+import orjson
+import pytest
+from fastapi import FastAPI, HTTPException, status
+from fastapi.testclient import TestClient
+
+import utils.cache
+from utils.cache import cache, cached
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(cache, "redis", fakeredis.aioredis.FakeRedis())
+    cache.local.clear()
+    calls = []
+    app = FastAPI()
+
+    @app.get("/local/{item_id}")
+    @cached("item_{item_id}", dict, negative_ex=60, local=True)
+    async def get_local(item_id: int):
+        calls.append(item_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No item with id {item_id}")
+
+    @app.get("/paged/{item_id}")
+    @cached("pages_{item_id}", dict, field="{limit}", negative_ex=60, local=True)
+    async def get_paged(item_id: int, limit: int = 10):
+        calls.append(item_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No item with id {item_id}")
+
+    @app.get("/remote/{item_id}")
+    @cached("remote_item_{item_id}", dict, negative_ex=60)
+    async def get_remote(item_id: int):
+        calls.append(item_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No item with id {item_id}")
+
+    with TestClient(app) as test_client:
+        yield test_client, calls
+    cache.local.clear()
+
+
+@pytest.mark.parametrize("path", ["/local/999", "/paged/999", "/remote/999"])
+def test_missing_resource_stays_404_when_requested_again(client, path):
+    test_client, calls = client
+    for _ in range(3):
+        response = test_client.get(path)
+        assert response.status_code == 404
+        assert response.json() == {"detail": "No item with id 999"}
+    assert calls == [999]
+
+
+def test_local_cache_holds_bytes(client):
+    test_client, _ = client
+    test_client.get("/local/1")
+    assert isinstance(cache.local.get("item_1"), bytes)
+
+
+@pytest.mark.anyio
+async def test_hash_fields_do_not_extend_the_ttl(monkeypatch):
+    monkeypatch.setattr(cache, "redis", fakeredis.aioredis.FakeRedis())
+    await cache.hset("pages", "10:None", b"[]", ex=100)
+    await cache.redis.expire("pages", 5)
+    await cache.hset("pages", "10:abc", b"[]", ex=100)
+    assert await cache.redis.ttl("pages") <= 5
+
+
+@pytest.mark.anyio
+async def test_listener_survives_malformed_messages(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache, "redis", fakeredis.aioredis.FakeRedis(server=server))
+    monkeypatch.setattr(utils.cache.Redis, "from_url", lambda *args, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs))
+    cache.local.set("item_1", b"{}")
+    cache.start_invalidation_listener()
+    try:
+        while (await cache.redis.pubsub_numsub(cache.channel))[0][1] == 0:
+            await asyncio.sleep(0.01)
+        for garbage in (b"not json", b'{"keys": ["item_1"]}', b"[]"):
+            await cache.redis.publish(cache.channel, garbage)
+        await cache.redis.publish(cache.channel, orjson.dumps({"origin": "other", "keys": ["item_1"]}))
+        async with asyncio.timeout(2):
+            while cache.local.get("item_1") is not None:
+                await asyncio.sleep(0.01)
+        assert not cache._listener.done()
+    finally:
+        cache._listener.cancel()
+        cache._listener = None
+        cache.local.clear()
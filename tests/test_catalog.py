@@ -0,0 +1,62 @@
+import fakeredis
+import pytest
+
+from utils.cache import Cache, cache
+from utils.catalog import CATALOG_CHANGED_KEY, exercise_catalog
+
+
+class FakeScalars:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, ids):
+        self.ids = ids
+
+    async def scalars(self, statement):
+        return FakeScalars(self.ids)
+
+
+@pytest.fixture
+def fresh_catalog(monkeypatch):
+    monkeypatch.setattr(cache, "redis", fakeredis.aioredis.FakeRedis())
+    monkeypatch.setattr(exercise_catalog, "_loaded_at", float("inf"))
+    monkeypatch.setattr(exercise_catalog, "ids", frozenset({1, 2}))
+    cache.local.clear()
+    yield exercise_catalog
+    cache.local.clear()
+
+
+@pytest.mark.anyio
+async def test_cache_fills_do_not_reload_the_catalog(fresh_catalog):
+    other_worker = Cache()
+    cache._on_invalidation(other_worker._invalidation(["exercise_1", "exercises_pages"], fill=True))
+    assert not fresh_catalog.is_stale
+
+
+@pytest.mark.anyio
+async def test_deleting_exercise_responses_does_not_reload_the_catalog(fresh_catalog):
+    await cache.delete("exercise_1")
+    assert not fresh_catalog.is_stale
+
+
+@pytest.mark.anyio
+async def test_changed_reloads_the_catalog_everywhere(fresh_catalog):
+    other_worker = Cache()
+    cache._on_invalidation(other_worker._invalidation([CATALOG_CHANGED_KEY]))
+    assert fresh_catalog.is_stale
+
+
+@pytest.mark.anyio
+async def test_changed_drops_cached_exercises_old_and_new(fresh_catalog):
+    for key in ("exercise_1", "exercise_3", "exercises_pages"):
+        await cache.set(key, b"{}", local=True)
+    await fresh_catalog.changed(FakeSession([1, 3]))
+    assert fresh_catalog.is_stale
+    for key in ("exercise_1", "exercise_3", "exercises_pages"):
+        assert not await cache.redis.exists(key)
+        assert cache.local.get(key) is None
@@ -0,0 +1,48 @@
+import pytest
+from fastapi import HTTPException
+
+import models
+from utils.pagination import decode_cursor, encode_cursor
+
+COLUMNS = (models.WorkoutLog.date, models.WorkoutLog.id)
+PROGRESS_COLUMNS = (models.Progress.date, models.Progress.id)
+EXERCISE_COLUMNS = (models.Exercise.exercise_id,)
+
+
+def test_cursor_round_trip():
+    values = decode_cursor(encode_cursor(["2024-03-01T08:30:00", 42]), COLUMNS)
+    assert values[0].isoformat() == "2024-03-01T08:30:00"
+    assert values[1] == 42
+
+
+def test_integer_cursor_round_trip():
+    assert decode_cursor(encode_cursor([7]), EXERCISE_COLUMNS) == [7]
+    values = decode_cursor(encode_cursor(["2024-03-01", 42]), PROGRESS_COLUMNS)
+    assert values[0].isoformat() == "2024-03-01"
+    assert values[1] == 42
+
+
+@pytest.mark.parametrize("columns, values", [
+    (COLUMNS, [None, 42]),
+    (COLUMNS, [123, 42]),
+    (COLUMNS, ["2024-03-01T08:30:00"]),
+    (COLUMNS, "not a list"),
+    (COLUMNS, ["2024-03-01T08:30:00", "42"]),
+    (EXERCISE_COLUMNS, ["abc"]),
+    (EXERCISE_COLUMNS, [None]),
+    (EXERCISE_COLUMNS, [True]),
+    (EXERCISE_COLUMNS, [1.5]),
+    (EXERCISE_COLUMNS, [[1]]),
+    (PROGRESS_COLUMNS, ["2024-03-01", "x"]),
+    (PROGRESS_COLUMNS, ["2024-03-01T08:30:00", 42]),
+])
+def test_malformed_cursor_is_a_bad_request(columns, values):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(values), columns)
+    assert error.value.status_code == 400
+
+
+def test_garbage_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("%%%", COLUMNS)
+    assert error.value.status_code == 400
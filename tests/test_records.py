@@ -0,0 +1,75 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from utils.records import estimated_one_rep_max, update_personal_records
+
+
+class FakeSession:
+    """Serves stored records to the lookup and captures the upsert."""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.statements = []
+
+    async def scalars(self, statement):
+        return SimpleNamespace(all=lambda: self.stored)
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def logged(id, weight, reps, exercise_id=1):
+    return SimpleNamespace(id=id, exercise_id=exercise_id, weight_used=weight, reps_completed=reps, sets_completed=3)
+
+
+def stored(max_weight=100.0, max_weight_reps=5, max_reps=12, estimated=116.67):
+    return SimpleNamespace(
+        exercise_id=1, max_weight=max_weight, max_weight_reps=max_weight_reps,
+        max_reps=max_reps, estimated_one_rep_max=estimated,
+    )
+
+
+def records(new_records, id):
+    return {record["record"]: record for record in new_records.get(id, [])}
+
+
+def test_epley_estimate():
+    assert estimated_one_rep_max(100, 1) == 100
+    assert estimated_one_rep_max(100, 30) == 200
+    assert estimated_one_rep_max(None, 5) is None
+    assert estimated_one_rep_max(100, 0) is None
+
+
+@pytest.mark.anyio
+async def test_heavier_set_is_a_max_weight_record():
+    db = FakeSession([stored()])
+    new_records = await update_personal_records(db, uuid.uuid4(), [logged(1, 105.0, 3)])
+    assert records(new_records, 1)["max_weight"] == {"record": "max_weight", "value": 105.0, "previous": 100.0}
+    assert len(db.statements) == 1
+
+
+@pytest.mark.anyio
+async def test_more_reps_at_the_same_weight_is_not_a_max_weight_record():
+    db = FakeSession([stored()])
+    new_records = await update_personal_records(db, uuid.uuid4(), [logged(1, 100.0, 6)])
+    found = records(new_records, 1)
+    assert "max_weight" not in found
+    assert found["max_weight_reps"] == {"record": "max_weight_reps", "value": 6, "previous": 5}
+
+
+@pytest.mark.anyio
+async def test_set_below_every_record_reports_nothing():
+    db = FakeSession([stored()])
+    new_records = await update_personal_records(db, uuid.uuid4(), [logged(1, 80.0, 5)])
+    assert new_records == {}
+    assert db.statements == []
+
+
+@pytest.mark.anyio
+async def test_first_sets_of_an_exercise_compare_in_order():
+    db = FakeSession([])
+    new_records = await update_personal_records(db, uuid.uuid4(), [logged(1, 60.0, 10), logged(2, 60.0, 8)])
+    assert set(records(new_records, 1)) == {"max_weight", "max_reps", "estimated_one_rep_max"}
+    assert 2 not in new_records
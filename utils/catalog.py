@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import Config
+from utils.cache import cache
+from utils.logger import setup_logger
+
+logger = setup_logger("catalog")
+
+# The only exercise columns the model needs to pick exercises for a plan
+PROMPT_FIELDS = ("exercise_id", "name", "muscle_group", "category", "difficulty_level", "equipment_needed")
+# Never stored; deleting it tells every worker the exercise table has changed
+CATALOG_CHANGED_KEY = "exercise_catalog"
+
+
+class ExerciseCatalog:
+    """
+    In-memory snapshot of the `exercise` table used to build GenAI prompts.
+
+    The table is read once and kept as a compact, pre-serialized JSON string
+    together with the set of valid ids. `version` is a hash of that string, so
+    every worker holding the same catalog reports the same version. The
+    snapshot is reloaded after whoever writes to the exercise table calls
+    `changed`, or after `ttl` seconds, whichever comes first.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.version: str | None = None
+        self.ids: frozenset[int] = frozenset()
+        self.prompt_json = "[]"
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    async def get(self, db: AsyncSession) -> "ExerciseCatalog":
+        """Return the snapshot, loading it first if it is missing or stale."""
+        if self.is_stale:
+            async with self._lock:
+                if self.is_stale:
+                    await self.load(db)
+        return self
+
+    async def load(self, db: AsyncSession):
+        columns = [getattr(models.Exercise, field) for field in PROMPT_FIELDS]
+        rows = (await db.execute(select(*columns).order_by(models.Exercise.exercise_id))).all()
+        compact = [
+            {field: value for field, value in zip(PROMPT_FIELDS, row) if value is not None}
+            for row in rows
+        ]
+        prompt_json = json.dumps(compact, separators=(",", ":"))
+        version = hashlib.blake2b(prompt_json.encode(), digest_size=8).hexdigest()
+        if version != self.version:
+            logger.info(f"Loaded exercise catalog version {version} ({len(compact)} exercises)")
+        self.ids = frozenset(row.exercise_id for row in rows)
+        self.prompt_json = prompt_json
+        self.version = version
+        self._loaded_at = time.monotonic()
+
+    async def changed(self, db: AsyncSession):
+        """Tell every worker the exercise table was written to.
+
+        Drops the catalog snapshots along with the cached exercise responses,
+        including 404s cached for ids that now exist.
+        """
+        ids = set((await db.scalars(select(models.Exercise.exercise_id))).all()) | self.ids
+        await cache.delete(CATALOG_CHANGED_KEY, "exercises_pages", *(f"exercise_{id}" for id in sorted(ids)))
+
+    def invalidate(self, keys: list[str]):
+        if CATALOG_CHANGED_KEY in keys:
+            self._loaded_at = float("-inf")
+
+
+exercise_catalog = ExerciseCatalog(Config.EXERCISE_CATALOG_TTL)
+cache.add_invalidation_hook(exercise_catalog.invalidate)
+
+
+async def _main():
+    from db.database import sessionmanger
+
+    try:
+        async with sessionmanger.session() as db:
+            await exercise_catalog.changed(db)
+    finally:
+        await cache.close()
+        await sessionmanger.close()
+
+
+if __name__ == "__main__":
+    # The API doesn't write exercises; run this after editing the table directly:
+    #     python -m utils.catalog
+    asyncio.run(_main())
@@ -0,0 +1,48 @@
+import re
+
+PLAN_GENERATION = "Workout Plan Generation"
+QNA = "QnA with assistant"
+
+# (pattern, weight) pairs; a query's score is the plan weights minus the QnA weights
+PLAN_PATTERNS = [
+    (re.compile(r"\b(create|generate|make|build|design|give me|need|want|suggest)\b.*\b(plan|program|programme|routine|schedule|split)\b"), 3),
+    (re.compile(r"\b(workout|training|exercise|gym|fitness)\s+(plan|program|programme|routine|schedule)\b"), 2),
+    (re.compile(r"\b\d+\s*-?\s*(week|day)s?\b"), 1),
+    (re.compile(r"\b(for me|my goal|to (lose|gain|build|get))\b"), 1),
+]
+QNA_PATTERNS = [
+    (re.compile(r"^(what|why|how|when|which|who|is|are|can|should|does|do|will)\b"), 2),
+    (re.compile(r"\?$"), 1),
+    (re.compile(r"\b(explain|difference|meaning|benefits?|tips?|advice|safe|bad|good for)\b"), 2),
+]
+# Minimum score difference for the rules to answer without the model
+MARGIN = 3
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and collapse whitespace so equivalent queries share a cache key."""
+    return _WHITESPACE.sub(" ", query.strip().lower())
+
+
+def classify_intent(query: str) -> str | None:
+    """
+    Classify obvious queries with keyword patterns.
+
+    Returns:
+        str | None: PLAN_GENERATION or QNA, or None when the query is ambiguous
+        and should be sent to the model.
+    """
+    text = normalize_query(query)
+    score = sum(weight for pattern, weight in PLAN_PATTERNS if pattern.search(text))
+    score -= sum(weight for pattern, weight in QNA_PATTERNS if pattern.search(text))
+    if score >= MARGIN:
+        return PLAN_GENERATION
+    if score <= -MARGIN:
+        return QNA
+    return None
+
+
+# How each intent was decided, to measure how often the model call is skipped
+intent_sources = {"rules": 0, "cache": 0, "llm": 0}
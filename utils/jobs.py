@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+import orjson
+
+from config import Config
+from utils.cache import cache
+from utils.logger import setup_logger
+
+logger = setup_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """The queue already holds `max_size` jobs."""
+
+
+class JobQueue:
+    """
+    In-process queue drained by a fixed number of worker tasks.
+
+    Job status lives in Redis under `job:{id}`, so any instance can answer a
+    status poll while the job runs on the instance that accepted it. A job
+    whose function raises an error accepted by `is_transient` is retried with
+    exponential backoff, up to `max_attempts` attempts in total.
+    """
+
+    def __init__(self, workers: int, max_size: int, max_attempts: int, ttl: int):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        user_id: str,
+        func: Callable[..., Awaitable[dict]],
+        *args,
+        is_transient: Callable[[Exception], bool] = lambda e: False,
+    ) -> str:
+        """Queue `func(*args)` and return the job id. `func` returns the job's result dict."""
+        if self._queue.full():
+            raise JobQueueFull(f"{self._queue.qsize()} jobs already queued")
+        job_id = uuid.uuid4().hex
+        await self._save(job_id, {"job_id": job_id, "user_id": user_id, "status": QUEUED, "attempts": 0})
+        self._queue.put_nowait((job_id, func, args, is_transient))
+        return job_id
+
+    async def get(self, job_id: str) -> dict | None:
+        job = await cache.get(f"job:{job_id}")
+        return orjson.loads(job) if job is not None else None
+
+    async def _save(self, job_id: str, job: dict[str, Any]):
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        await cache.set(f"job:{job_id}", orjson.dumps(job), ex=self.ttl)
+
+    async def _work(self):
+        while True:
+            job_id, func, args, is_transient = await self._queue.get()
+            try:
+                await self._run(job_id, func, args, is_transient)
+            except Exception as e:
+                # Status writes failing must not kill the worker
+                logger.error(f"Job {job_id} could not be recorded: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id, func, args, is_transient):
+        job = await self.get(job_id) or {"job_id": job_id}
+        for attempt in range(1, self.max_attempts + 1):
+            job.update(status=RUNNING, attempts=attempt)
+            await self._save(job_id, job)
+            try:
+                result = await func(*args)
+            except Exception as e:
+                if attempt < self.max_attempts and is_transient(e):
+                    delay = 2 ** attempt
+                    logger.warning(f"Job {job_id} attempt {attempt} failed ({e}); retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Job {job_id} failed: {e}")
+                job.update(status=FAILED, error=getattr(e, "detail", None) or str(e))
+                await self._save(job_id, job)
+                return
+            job.update(status=DONE, **result)
+            await self._save(job_id, job)
+            return
+
+    def stats(self):
+        return {"workers": self.workers, "queued": self._queue.qsize()}
+
+
+job_queue = JobQueue(
+    Config.GENAI_JOB_WORKERS,
+    Config.GENAI_JOB_QUEUE_SIZE,
+    Config.GENAI_JOB_MAX_ATTEMPTS,
+    Config.GENAI_JOB_TTL,
+)
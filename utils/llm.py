@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import json
+import re
+import time
+
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("llm")
+
+
+class LLMQueueTimeout(Exception):
+    """No model slot became free within the queue timeout."""
+
+
+class LLMResponseError(ValueError):
+    """The model answered with JSON that doesn't match the requested schema."""
+
+
+def validate_schema(value, schema: dict, path: str = "$"):
+    """Check `value` against a Vertex AI response schema (OBJECT/ARRAY/STRING/NUMBER/INTEGER/BOOLEAN).
+
+    Raises:
+        LLMResponseError: naming the first path that doesn't match
+    """
+    kind = schema.get("type", "").upper()
+    if kind == "OBJECT":
+        if not isinstance(value, dict):
+            raise LLMResponseError(f"{path}: expected an object")
+        for name in schema.get("required", []):
+            if name not in value:
+                raise LLMResponseError(f"{path}.{name}: missing")
+        for name, subschema in schema.get("properties", {}).items():
+            if name in value:
+                validate_schema(value[name], subschema, f"{path}.{name}")
+    elif kind == "ARRAY":
+        if not isinstance(value, list):
+            raise LLMResponseError(f"{path}: expected an array")
+        for i, item in enumerate(value):
+            validate_schema(item, schema.get("items", {}), f"{path}[{i}]")
+    elif kind == "STRING":
+        if not isinstance(value, str):
+            raise LLMResponseError(f"{path}: expected a string")
+    elif kind in ("NUMBER", "INTEGER"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise LLMResponseError(f"{path}: expected a number")
+    elif kind == "BOOLEAN":
+        if not isinstance(value, bool):
+            raise LLMResponseError(f"{path}: expected a boolean")
+
+
+class LLMLimiter:
+    """Caps outstanding model calls per worker and measures how long callers queue.
+
+    Every Vertex AI request goes through `generate`, so a burst of plan
+    generations waits here instead of piling onto the event loop and the
+    database pool.
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the `max_concurrency` slots for the duration of the block."""
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self.queue_timeouts += 1
+            raise LLMQueueTimeout(f"No model slot free after {self.queue_timeout}s")
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - start
+        self.calls += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait > 1:
+            logger.warning(f"Waited {wait:.2f}s for a model slot ({self.in_flight} in flight)")
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def generate(self, model, contents, timeout: float, **kwargs):
+        """`model.generate_content_async` inside a slot, bounded by `timeout` seconds."""
+        async with self.slot():
+            try:
+                async with asyncio.timeout(timeout):
+                    return await model.generate_content_async(contents, **kwargs)
+            except TimeoutError:
+                self.timeouts += 1
+                raise
+
+    async def stream(self, model, contents, timeout: float, **kwargs):
+        """Yield the text of each streamed response chunk, holding one slot until the stream ends.
+
+        `timeout` bounds the whole stream, not each chunk.
+        """
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            try:
+                responses = await asyncio.wait_for(model.generate_content_async(contents, stream=True, **kwargs), timeout)
+                chunks = aiter(responses)
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    yield chunk.text
+            except TimeoutError:
+                self.timeouts += 1
+                raise
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "avg_queue_wait_ms": round(self.total_wait / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_queue_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class JsonArrayStreamParser:
+    """
+    Pull the elements of one top-level array out of a JSON document as it streams in.
+
+    `feed` takes the next chunk of text and returns the elements of the array
+    named `key` that were completed by it, so callers can forward each one
+    before the model has finished the rest of the document. `text` holds
+    everything fed so far.
+    """
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(rf'"{re.escape(key)}"\s*:\s*$')
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        items = []
+        while self._pos < len(self.text):
+            char = self.text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+                if char == "[" and self._array_depth is None and self._depth == 2 and self._key_pattern.search(self.text, 0, self._pos):
+                    self._array_depth = self._depth
+                elif self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item_start = self._pos
+            elif char in "]}":
+                if self._item_start is not None and self._depth == self._array_depth + 1:
+                    items.append(json.loads(self.text[self._item_start:self._pos + 1]))
+                    self._item_start = None
+                elif char == "]" and self._depth == self._array_depth:
+                    self._array_depth = -1  # array closed; ignore anything after it
+                self._depth -= 1
+            self._pos += 1
+        return items
+
+
+llm_limiter = LLMLimiter(Config.GENAI_MAX_CONCURRENCY, Config.GENAI_QUEUE_TIMEOUT)
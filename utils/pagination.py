@@ -0,0 +1,70 @@
+import base64
+from datetime import date, datetime
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque cursor for the sort key of the last row on a page; dates are written in ISO format."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list:
+    """Sort key values from `encode_cursor`, converted back to the columns' Python types.
+
+    Every value is checked against its column's type before it can reach the
+    query, so a tampered cursor is rejected here rather than by the database.
+
+    Raises:
+        HTTPException: 400 if the cursor wasn't produced by `encode_cursor` for these columns
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _cursor_value(column, value):
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        if not isinstance(value, str):
+            raise TypeError(f"{column.key} must be an ISO date")
+        return python_type.fromisoformat(value)
+    if python_type is float and type(value) is int:
+        return float(value)
+    # An exact type match, so JSON true/false isn't taken for an Integer column
+    if type(value) is not python_type:
+        raise TypeError(f"{column.key} must be {python_type.__name__}")
+    return value
+
+
+async def paginate(db: AsyncSession, query: Select, columns: tuple, cursor: str | None, limit: int, descending: bool = False) -> dict:
+    """
+    Keyset pagination over `query` ordered by `columns`.
+
+    `columns` must end with a unique column (usually the primary key) so the
+    order is total, and must not be NULL in any row of `query`: NULLs can't
+    be compared in the row-value keyset or encoded in a cursor. The page starts after the row the cursor points at with a
+    row-value comparison, so any page costs an index range scan of `limit`
+    rows, however deep it is.
+
+    Returns:
+        dict: `items` and `next_cursor`, which is None on the last page
+    """
+    if cursor is not None:
+        key = tuple_(*columns)
+        after = tuple_(*decode_cursor(cursor, columns))
+        query = query.where(key < after if descending else key > after)
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,108 @@
+import uuid
+from datetime import date, timedelta
+from typing import List
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from utils.cache import cache
+from utils.logger import setup_logger
+
+logger = setup_logger("progress")
+
+METRICS = ("weight", "bmi", "body_fat_percentage", "muscle_mass")
+BUCKETS = ("day", "week", "month")
+# Hash field holding the newest bucket of a cached series ("" when it is empty)
+LAST_BUCKET_FIELD = "_last"
+
+
+def progress_analytics_key(user_id, bucket:str) -> str:
+    return f"progress_analytics_{user_id}_{bucket}"
+
+
+def progress_analytics_keys(user_id) -> List[str]:
+    return [progress_analytics_key(user_id, bucket) for bucket in BUCKETS]
+
+
+def bucket_start(day:date, bucket:str) -> date:
+    """First day of the bucket `day` falls in, matching Postgres date_trunc (weeks start on Monday)."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def buckets_before(start:date, bucket:str, count:int) -> date:
+    """Start of the bucket `count` buckets before the one starting at `start`."""
+    if bucket == "week":
+        return start - timedelta(weeks=count)
+    if bucket == "month":
+        year, month = divmod(start.year * 12 + start.month - 1 - count, 12)
+        return date(year, month + 1, 1)
+    return start - timedelta(days=count)
+
+
+def progress_buckets_query(bucket:str):
+    # `bucket` is one of BUCKETS and the window size comes from Config, so
+    # both are safe to inline; date_trunc and the frame offset need literals.
+    span = f"{Config.PROGRESS_MOVING_AVERAGE_BUCKETS - 1} {bucket}s"
+    aggregates = ", ".join(f"avg({m}) AS {m}_avg, min({m}) AS {m}_min, max({m}) AS {m}_max" for m in METRICS)
+    moving_averages = ", ".join(f"avg({m}_avg) OVER trailing AS {m}_moving_avg" for m in METRICS)
+    return text(f"""
+        WITH buckets AS (
+            SELECT date_trunc('{bucket}', date)::date AS bucket_start, count(*) AS entries, {aggregates}
+            FROM progress
+            WHERE user_id = :user_id AND date >= :since
+            GROUP BY 1
+        )
+        SELECT *, {moving_averages}
+        FROM buckets
+        WINDOW trailing AS (ORDER BY bucket_start RANGE BETWEEN interval '{span}' PRECEDING AND CURRENT ROW)
+        ORDER BY bucket_start
+    """)
+
+
+async def load_progress_buckets(db:AsyncSession, user_id, bucket:str, since:date = date.min) -> List[dict]:
+    """Bucketed aggregates of the user's entries from `since` on, oldest bucket first."""
+    result = await db.execute(progress_buckets_query(bucket), {"user_id": uuid.UUID(str(user_id)), "since": since})
+    return [dict(row) for row in result.mappings()]
+
+
+async def refresh_progress_analytics(db:AsyncSession, user_id, day:date):
+    """
+    Bring the cached analytics up to date after an entry on `day` was added.
+
+    An entry in the newest cached bucket (or a newer one) only recomputes that
+    bucket, reading just enough earlier buckets for its moving average. An
+    entry in an older bucket shifts the moving averages after it, so that
+    series is dropped and rebuilt on the next read. Failures drop the cache
+    rather than fail the write.
+    """
+    keys = progress_analytics_keys(user_id)
+    try:
+        async with cache.pipeline() as pipe:
+            for key in keys:
+                pipe.hget(key, LAST_BUCKET_FIELD)
+            last_buckets = await pipe.execute()
+
+        stale = []
+        for bucket, key, last in zip(BUCKETS, keys, last_buckets):
+            if last is None:
+                continue  # nothing cached for this bucket size
+            start = bucket_start(day, bucket)
+            if start.isoformat() < last.decode():
+                stale.append(key)
+                continue
+            since = buckets_before(start, bucket, Config.PROGRESS_MOVING_AVERAGE_BUCKETS - 1)
+            rows = [row for row in await load_progress_buckets(db, user_id, bucket, since) if row["bucket_start"] >= start]
+            mapping = {row["bucket_start"].isoformat(): orjson.dumps(row) for row in rows}
+            mapping[LAST_BUCKET_FIELD] = start.isoformat()
+            await cache.hset_many(key, mapping, ex=Config.PROGRESS_ANALYTICS_TTL)
+        if stale:
+            await cache.delete(*stale)
+    except Exception as e:
+        logger.warning(f"Could not refresh progress analytics: {e}")
+        await cache.delete(*keys)
@@ -0,0 +1,146 @@
+from sqlalchemy import Integer, case, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from utils.logger import setup_logger
+
+logger = setup_logger("records")
+
+
+def personal_records_key(user_id) -> str:
+    return f"personal_records_{user_id}"
+
+
+def estimated_one_rep_max(weight: float | None, reps: int | None) -> float | None:
+    """Epley estimate of the weight that could be lifted once for `reps` at `weight`."""
+    if not weight or not reps or weight <= 0 or reps <= 0:
+        return None
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def _merge(statement):
+    """
+    Upsert that keeps the better of the stored and the incoming values.
+
+    GREATEST ignores NULLs, so a missing value never replaces a recorded one.
+    The reps at max weight follow whichever row holds the max weight, and the
+    better of the two on a tie.
+    """
+    record, excluded = models.PersonalRecord, statement.excluded
+    stored_weight = func.coalesce(record.max_weight, 0)
+    return statement.on_conflict_do_update(
+        index_elements=[record.user_id, record.exercise_id],
+        set_={
+            "max_weight": func.greatest(record.max_weight, excluded.max_weight),
+            "max_weight_reps": case(
+                (excluded.max_weight > stored_weight, excluded.max_weight_reps),
+                (excluded.max_weight == stored_weight, func.greatest(record.max_weight_reps, excluded.max_weight_reps)),
+                else_=record.max_weight_reps,
+            ),
+            "max_reps": func.greatest(record.max_reps, excluded.max_reps),
+            "estimated_one_rep_max": func.greatest(record.estimated_one_rep_max, excluded.estimated_one_rep_max),
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def update_personal_records(db: AsyncSession, user_id, exercises: list) -> dict[int, list[dict]]:
+    """
+    Fold newly logged exercises into the user's personal records.
+
+    The stored records of the exercises involved are read with one query, the
+    new sets are compared against them in order, and the improved records are
+    written back with one upsert in the caller's transaction.
+
+    Returns:
+        dict: the records each log exercise set, keyed by its id; sets that
+        set no record are left out
+    """
+    exercise_ids = {exercise.exercise_id for exercise in exercises}
+    if not exercise_ids:
+        return {}
+    stored = (await db.scalars(select(models.PersonalRecord).where(
+        models.PersonalRecord.user_id == user_id,
+        models.PersonalRecord.exercise_id.in_(exercise_ids)
+    ))).all()
+    best = {
+        record.exercise_id: {
+            "max_weight": record.max_weight,
+            "max_weight_reps": record.max_weight_reps,
+            "max_reps": record.max_reps,
+            "estimated_one_rep_max": record.estimated_one_rep_max,
+        }
+        for record in stored
+    }
+
+    new_records, changed = {}, {}
+    for exercise in exercises:
+        current = best.setdefault(exercise.exercise_id, dict.fromkeys(("max_weight", "max_weight_reps", "max_reps", "estimated_one_rep_max")))
+        weight, reps = exercise.weight_used, exercise.reps_completed
+        found = []
+        if weight and weight > 0 and weight > (current["max_weight"] or 0):
+            found.append({"record": "max_weight", "value": weight, "previous": current["max_weight"]})
+            current["max_weight"], current["max_weight_reps"] = weight, reps
+        elif weight and weight == current["max_weight"] and (reps or 0) > (current["max_weight_reps"] or 0):
+            # Matching the heaviest weight for more reps is a record of its own
+            found.append({"record": "max_weight_reps", "value": reps, "previous": current["max_weight_reps"]})
+            current["max_weight_reps"] = reps
+        if reps and reps > (current["max_reps"] or 0):
+            found.append({"record": "max_reps", "value": reps, "previous": current["max_reps"]})
+            current["max_reps"] = reps
+        estimate = estimated_one_rep_max(weight, reps)
+        if estimate and estimate > (current["estimated_one_rep_max"] or 0):
+            found.append({"record": "estimated_one_rep_max", "value": estimate, "previous": current["estimated_one_rep_max"]})
+            current["estimated_one_rep_max"] = estimate
+        if found:
+            new_records[exercise.id] = found
+            changed[exercise.exercise_id] = current
+
+    if changed:
+        await db.execute(_merge(insert(models.PersonalRecord).values([
+            {"user_id": user_id, "exercise_id": exercise_id, **record} for exercise_id, record in changed.items()
+        ])))
+        logger.info(f"{sum(map(len, new_records.values()))} new personal records for {len(changed)} exercises")
+    return new_records
+
+
+async def rollup_personal_records(db: AsyncSession, condition):
+    """
+    Merge the bests of the log exercises matching `condition` into the
+    records with a single INSERT ... SELECT, for bulk writes where nothing is
+    reported back per set.
+    """
+    log_exercise = models.WorkoutLogExercise
+    weight, reps = log_exercise.weight_used, log_exercise.reps_completed
+    estimate = case(
+        (reps == 1, weight),
+        else_=weight * (1 + reps / 30.0),
+    )
+    source = (
+        select(
+            models.WorkoutLog.user_id,
+            log_exercise.exercise_id,
+            func.max(weight).filter(weight > 0),
+            # reps of the heaviest set, the most reps among sets at that weight
+            func.array_agg(
+                aggregate_order_by(case((weight > 0, reps)), weight.desc().nullslast(), reps.desc().nullslast()),
+                type_=ARRAY(Integer)
+            )[1],
+            func.max(reps).filter(reps > 0),
+            func.max(estimate).filter(weight > 0, reps > 0),
+        )
+        .select_from(log_exercise)
+        .join(models.WorkoutLog, models.WorkoutLog.id == log_exercise.workout_log_id)
+        .where(condition)
+        .group_by(models.WorkoutLog.user_id, log_exercise.exercise_id)
+    )
+    await db.execute(_merge(insert(models.PersonalRecord).from_select(
+        ["user_id", "exercise_id", "max_weight", "max_weight_reps", "max_reps", "estimated_one_rep_max"], source
+    )))
+
+
+async def rebuild_personal_records(db: AsyncSession, user_id):
+    """Recompute a user's records from their remaining logs, after logs were deleted."""
+    await db.execute(delete(models.PersonalRecord).where(models.PersonalRecord.user_id == user_id))
+    await rollup_personal_records(db, models.WorkoutLog.user_id == user_id)
@@ -0,0 +1,103 @@
+from sqlalchemy import Date, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from utils.logger import setup_logger
+
+logger = setup_logger("volume")
+
+# Rollup bucket for exercises whose muscle group isn't set
+UNSPECIFIED_MUSCLE_GROUP = "unspecified"
+
+
+def training_volume_key(user_id) -> str:
+    return f"training_volume_{user_id}"
+
+
+def workout_summary_key(user_id) -> str:
+    return f"workout_summary_{user_id}"
+
+
+async def rollup_training_volume(db: AsyncSession, condition, sign: int = 1):
+    """
+    Add the log exercises matching `condition` to the weekly volume rollup.
+
+    The matching rows are aggregated per (user, week, muscle group) and merged
+    into `training_volume` with a single INSERT ... SELECT ... ON CONFLICT DO
+    UPDATE, in the caller's transaction. Reps are sets x reps per set and
+    tonnage is reps x weight. Use `sign=-1` before deleting rows so their
+    volume is taken back out.
+    """
+    log_exercise = models.WorkoutLogExercise
+    sets = func.coalesce(log_exercise.sets_completed, 0)
+    reps = sets * func.coalesce(log_exercise.reps_completed, 0)
+    week_start = cast(func.date_trunc("week", models.WorkoutLog.date), Date)
+    muscle_group = func.coalesce(models.Exercise.muscle_group, UNSPECIFIED_MUSCLE_GROUP)
+    source = (
+        select(
+            models.WorkoutLog.user_id,
+            week_start,
+            muscle_group,
+            sign * func.sum(sets),
+            sign * func.sum(reps),
+            sign * func.sum(reps * func.coalesce(log_exercise.weight_used, 0)),
+        )
+        .select_from(log_exercise)
+        .join(models.WorkoutLog, models.WorkoutLog.id == log_exercise.workout_log_id)
+        .join(models.Exercise, models.Exercise.exercise_id == log_exercise.exercise_id)
+        .where(condition, models.WorkoutLog.date.is_not(None))
+        .group_by(models.WorkoutLog.user_id, week_start, muscle_group)
+    )
+    volume = models.TrainingVolume
+    statement = insert(volume).from_select(
+        ["user_id", "week_start", "muscle_group", "sets", "reps", "tonnage"], source
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[volume.user_id, volume.week_start, volume.muscle_group],
+        set_={
+            "sets": volume.sets + statement.excluded.sets,
+            "reps": volume.reps + statement.excluded.reps,
+            "tonnage": volume.tonnage + statement.excluded.tonnage,
+        },
+    )
+    await db.execute(statement)
+
+
+async def refresh_workout_log_totals(db: AsyncSession, condition) -> dict[int, dict]:
+    """
+    Recompute the estimated calories of the workout logs whose exercises
+    match `condition`, with one UPDATE ... FROM.
+
+    Sets carry no timing, so the log's duration is used as its active time.
+    It is split across the exercises by sets, and each share burns the
+    exercise's calories_burnt_per_minute (none when unknown). So the calories
+    are the duration times the set-weighted average rate. Logs without
+    exercises keep the zero default.
+
+    Returns:
+        dict: the new totals, keyed by workout log id
+    """
+    log_exercise = models.WorkoutLogExercise
+    sets = func.coalesce(log_exercise.sets_completed, 0)
+    total_sets = func.sum(sets)
+    totals = (
+        select(
+            log_exercise.workout_log_id,
+            (func.sum(sets * func.coalesce(models.Exercise.calories_burnt_per_minute, 0))
+             / func.nullif(total_sets, 0)).label("calories_per_minute"),
+        )
+        .join(models.Exercise, models.Exercise.exercise_id == log_exercise.exercise_id)
+        .where(condition)
+        .group_by(log_exercise.workout_log_id)
+        .subquery()
+    )
+    duration = func.coalesce(models.WorkoutLog.duration, 0)
+    result = await db.execute(
+        update(models.WorkoutLog)
+        .where(models.WorkoutLog.id == totals.c.workout_log_id)
+        .values(estimated_calories=duration * func.coalesce(totals.c.calories_per_minute, 0))
+        .returning(models.WorkoutLog.id, models.WorkoutLog.estimated_calories)
+        .execution_options(synchronize_session=False)
+    )
+    return {row.id: {"estimated_calories": row.estimated_calories} for row in result}